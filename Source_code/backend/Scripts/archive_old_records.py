@@ -0,0 +1,37 @@
+# Source_code/backend/Scripts/archive_old_records.py
+# Move old orders / private-room bookings / events out of the hot tables.
+# Schedule nightly, e.g.:  30 3 * * *  python Source_code/backend/Scripts/archive_old_records.py
+import argparse
+import os
+import sys
+from flask import Flask
+
+# ✅ Fix import paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from models import db
+from config import Config
+from archive import archive_older_than
+
+def make_app():
+    # Same instance/ (and so the same default SQLite database) as the app, whatever the cwd
+    app = Flask(__name__, instance_path=os.path.join(BASE_DIR, 'instance'))
+    app.config.from_object(Config)
+    db.init_app(app)
+    return app
+
+if __name__ == "__main__":
+    app = make_app()
+    parser = argparse.ArgumentParser(description="Archive records older than the retention horizon.")
+    parser.add_argument("--days", type=int, default=app.config['ARCHIVE_HORIZON_DAYS'],
+                        help="archive rows created more than this many days ago")
+    parser.add_argument("--chunk-size", type=int, default=app.config['ARCHIVE_CHUNK_SIZE'],
+                        help="rows moved per transaction")
+    args = parser.parse_args()
+
+    with app.app_context():
+        db.create_all()  # make sure the rollup table exists
+        moved = archive_older_than(args.days, app.config['ARCHIVE_DIR'], chunk_size=args.chunk_size)
+    for kind, count in moved.items():
+        print(f"🗄️ {kind}: archived {count} rows")
@@ -0,0 +1,19 @@
+# Source_code/backend/Scripts/build_assets.py
+# Fingerprint and precompress static assets into static/dist.
+# Run on every deploy (before starting the app), e.g. in the Render build command.
+import os
+import sys
+
+# ✅ Fix import paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+import assets
+
+STATIC_DIR = os.path.join(os.path.dirname(BASE_DIR), "static")
+
+if __name__ == "__main__":
+    manifest = assets.build_assets(STATIC_DIR)
+    print(f"✅ Built {len(manifest['files'])} assets into {os.path.join(STATIC_DIR, assets.DIST_DIR)}")
+    if assets.brotli is None:
+        print("ℹ️ brotli not installed — only gzip copies were written.")
@@ -0,0 +1,62 @@
+# Source_code/backend/Scripts/create_indexes.py
+# One-off migration: build indexes on large existing tables without blocking writes.
+# On PostgreSQL each index is built with CREATE INDEX CONCURRENTLY; run it once
+# after deploying, e.g.:  python Source_code/backend/Scripts/create_indexes.py
+# (SQLite databases get these indexes automatically at start-up.)
+import os
+import sys
+from flask import Flask
+from sqlalchemy import inspect
+
+# ✅ Fix import paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from models import db
+from config import Config
+from order_cache import HISTORY_INDEX
+from order_status import ACTIVE_STATUSES, QUEUE_INDEXES
+from search import postgres_index_statements
+
+def make_app():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+    return app
+
+def online_indexes():
+    """(name, table, CREATE INDEX CONCURRENTLY statement) for every managed index."""
+    return [
+        (HISTORY_INDEX.name, HISTORY_INDEX.table.name,
+         f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {HISTORY_INDEX.name} '
+         f'ON "{HISTORY_INDEX.table.name}" (customer_id, created_at)'),
+    ] + [
+        (index.name, index.table.name,
+         f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {index.name} '
+         f'ON "{index.table.name}" (created_at) WHERE status = \'{status}\'')
+        for index, status in zip(QUEUE_INDEXES, ACTIVE_STATUSES)
+    ] + postgres_index_statements()
+
+if __name__ == "__main__":
+    app = make_app()
+    with app.app_context():
+        if db.engine.dialect.name != 'postgresql':
+            print("ℹ️ Not a PostgreSQL database — indexes are created at app start-up.")
+            sys.exit(0)
+
+        # CONCURRENTLY cannot run inside a transaction block
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            inspector = inspect(conn)
+            invalid = {row[0] for row in conn.exec_driver_sql(
+                "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE NOT i.indisvalid")}
+            for name, table, statement in online_indexes():
+                if name in invalid:
+                    # left behind by an interrupted concurrent build
+                    print(f"🔄 Rebuilding invalid index {name}")
+                    conn.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+                elif name in {index['name'] for index in inspector.get_indexes(table)}:
+                    print(f"ℹ️ {name} already exists")
+                    continue
+                print(f"⏳ Building {name} …")
+                conn.exec_driver_sql(statement)
+                print(f"✅ {name} created")
@@ -0,0 +1,28 @@
+# Source_code/backend/Scripts/snapshot_orders.py
+# Rebuild the columnar sales snapshot used by /admin/reports.
+# Schedule nightly, e.g.:  0 3 * * *  python Source_code/backend/Scripts/snapshot_orders.py
+import os
+import sys
+from flask import Flask
+
+# ✅ Fix import paths
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BASE_DIR)
+
+from models import db
+from config import Config
+from analytics import build_snapshot
+
+def make_app():
+    # Same instance/ (and so the same default SQLite database) as the app, whatever the cwd
+    app = Flask(__name__, instance_path=os.path.join(BASE_DIR, 'instance'))
+    app.config.from_object(Config)
+    db.init_app(app)
+    return app
+
+if __name__ == "__main__":
+    app = make_app()
+    with app.app_context():
+        meta = build_snapshot(app.config['ANALYTICS_SNAPSHOT_DIR'],
+                              chunk_size=app.config['ANALYTICS_CHUNK_SIZE'])
+        print(f"✅ Snapshot written: {meta['rows']} rows ({meta['archived_orders']} archived orders) at {meta['generated_at']}")
@@ -1,8 +1,17 @@
 # backend/admin.py
-from flask import Blueprint, render_template, session, redirect, url_for, flash, request, jsonify
+from flask import Blueprint, render_template, session, redirect, url_for, flash, request, jsonify, current_app, abort, Response
 from functools import wraps
-from models import db, User, Order, PrivateRoom, Event  # adjust import path if necessary
+from itertools import islice
+from datetime import date, datetime, timedelta
+from sqlalchemy import func
+from models import db, User, Order, PrivateRoom, Event, OrderStatusEvent  # adjust import path if necessary
 from werkzeug.security import generate_password_hash
+from order_cache import order_history_cache
+from analytics import build_snapshot, load_snapshot, sales_report
+from search import search_index, SEARCH_SOURCES
+from order_status import ACTIVE_STATUSES, InvalidTransition, allowed_transitions, stage_metrics, transition
+from archive import archived_counts, iter_archived
+from profiling import profiler
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin', template_folder='../templates/admin')
 
@@ -30,7 +39,8 @@ def dashboard():
                            users_count=users_count,
                            orders_count=orders_count,
                            rooms_count=rooms_count,
-                           events_count=events_count)
+                           events_count=events_count,
+                           archived=archived_counts())
 
 # ---- Users list / manage ----
 @admin_bp.route('/users')
@@ -67,31 +77,196 @@ def demote_user(user_id):
 def orders_list():
     orders = Order.query.order_by(Order.created_at.desc()).all()
     # for each order we can show minimal info; template will iterate
-    return render_template('admin/listing.html', title="Orders", items=orders, kind='orders')
+    return _render_listing("Orders", orders, 'orders', allowed_transitions=allowed_transitions)
 
 # ---- Private rooms listing ----
 @admin_bp.route('/rooms')
 @admin_required
 def rooms_list():
     rooms = PrivateRoom.query.order_by(PrivateRoom.created_at.desc()).all()
-    return render_template('admin/listing.html', title="Private Rooms", items=rooms, kind='rooms')
+    return _render_listing("Private Rooms", rooms, 'rooms')
 
 # ---- Events listing ----
 @admin_bp.route('/events')
 @admin_required
 def events_list():
     events = Event.query.order_by(Event.created_at.desc()).all()
-    return render_template('admin/listing.html', title="Events", items=events, kind='events')
+    return _render_listing("Events", events, 'events')
 
-# ---- API helper to toggle order status (example) ----
+def _render_listing(title, items, kind, **extra):
+    """Render admin/listing.html, appending one page of archived rows when ?archived=1."""
+    include_archived = request.args.get('archived') == '1'
+    archive_page = max(request.args.get('archive_page', 1, type=int), 1)
+    archived_items, more_archived = [], False
+    if include_archived:
+        size = current_app.config['ARCHIVE_PAGE_SIZE']
+        start = (archive_page - 1) * size
+        # read only as many archive chunks as this page needs
+        archived_items = list(islice(iter_archived(kind, current_app.config['ARCHIVE_DIR']), start, start + size + 1))
+        more_archived = len(archived_items) > size
+        archived_items = archived_items[:size]
+    return render_template('admin/listing.html', title=title, items=items, kind=kind,
+                           include_archived=include_archived, archived_items=archived_items,
+                           archive_page=archive_page, more_archived=more_archived, **extra)
+
+# ---- Move an order along its lifecycle (Pending → Preparing → Ready → Delivered) ----
 @admin_bp.route('/orders/<int:order_id>/status', methods=['POST'])
 @admin_required
 def change_order_status(order_id):
-    new_status = request.form.get('status')
-    order = Order.query.get_or_404(order_id)
-    order.status = new_status
+    new_status = request.form.get('status') or (request.get_json(silent=True) or {}).get('status')
+    order = Order.query.filter_by(id=order_id).with_for_update().first_or_404()
+    try:
+        transition(order, new_status)
+    except InvalidTransition as e:
+        db.session.rollback()
+        if request.is_json:
+            return jsonify({'success': False, 'error': str(e)}), 400
+        flash(str(e), "warning")
+        return redirect(url_for('admin.orders_list'))
     db.session.commit()
+    order_history_cache.invalidate(order.customer_id)
     if request.is_json:
         return jsonify({'success': True, 'status': new_status})
     flash("Order status updated.", "success")
     return redirect(url_for('admin.orders_list'))
+
+# ---- Kitchen queue: active orders oldest-first + per-stage timings ----
+@admin_bp.route('/queue')
+@admin_required
+def kitchen_queue():
+    limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+    now = datetime.now()
+
+    # one index range scan per active status (see order_status.QUEUE_INDEXES)
+    stages = {
+        status: Order.query.filter(Order.status == status).order_by(Order.created_at).limit(limit).all()
+        for status in ACTIVE_STATUSES
+    }
+    counts = {status: Order.query.filter(Order.status == status).count() for status in ACTIVE_STATUSES}
+
+    ids = [order.id for orders in stages.values() for order in orders]
+    entered = dict(
+        db.session.query(OrderStatusEvent.order_id, func.max(OrderStatusEvent.created_at))
+        .filter(OrderStatusEvent.order_id.in_(ids))
+        .group_by(OrderStatusEvent.order_id)
+    ) if ids else {}
+
+    def entry(order):
+        stage_start = entered.get(order.id) or order.created_at
+        return {
+            'id': order.id,
+            'status': order.status,
+            'created_at': order.created_at.isoformat() if order.created_at else None,
+            'age_seconds': round((now - order.created_at).total_seconds()) if order.created_at else None,
+            'in_stage_seconds': round((now - stage_start).total_seconds()) if stage_start else None,
+            'items': order.items,
+            'method': order.method,
+            'special_requests': order.special_requests,
+        }
+
+    window = timedelta(hours=current_app.config['KITCHEN_METRICS_WINDOW_HOURS'])
+    return jsonify({
+        'generated_at': now.isoformat(),
+        'counts': counts,
+        'queue': {status: [entry(o) for o in orders] for status, orders in stages.items()},
+        'metrics': {
+            'window_hours': window.total_seconds() / 3600,
+            'stages': stage_metrics(since=now - window),
+        },
+    })
+
+# ---- Sales reports (served from the columnar snapshot, not the live DB) ----
+@admin_bp.route('/reports')
+@admin_required
+def reports():
+    snapshot = load_snapshot(current_app.config['ANALYTICS_SNAPSHOT_DIR'])
+    report = None
+    if snapshot is not None:
+        try:
+            start = date.fromisoformat(request.args['start']) if request.args.get('start') else None
+            end = date.fromisoformat(request.args['end']) if request.args.get('end') else None
+        except ValueError:
+            flash("Dates must be in YYYY-MM-DD format.", "warning")
+            start = end = None
+        report = sales_report(snapshot, start=start, end=end)
+
+    if request.args.get('format') == 'json':
+        if report is None:
+            return jsonify({'error': 'No snapshot has been built yet.'}), 404
+        return jsonify(report)
+    return render_template('admin/reports.html', report=report,
+                           start=request.args.get('start', ''), end=request.args.get('end', ''))
+
+@admin_bp.route('/reports/snapshot', methods=['POST'])
+@admin_required
+def refresh_snapshot():
+    meta = build_snapshot(current_app.config['ANALYTICS_SNAPSHOT_DIR'],
+                          chunk_size=current_app.config['ANALYTICS_CHUNK_SIZE'])
+    flash(f"Snapshot rebuilt from {meta['rows']} rows ({meta['archived_orders']} archived orders via rollups).",
+          "success")
+    return redirect(url_for('admin.reports'))
+
+# ---- Full-text search across customers, orders, rooms and events ----
+def _search_result(kind, obj):
+    if kind == 'user':
+        title, subtitle, body = obj.name, obj.email, f"Role: {obj.role}"
+        url = url_for('admin.users_list', _anchor=f"user-{obj.id}")
+    elif kind == 'order':
+        title = f"Order #{obj.id}"
+        subtitle = f"{obj.status} • ${obj.total or 0:.2f}"
+        body = ' — '.join(part for part in (obj.address, obj.special_requests) if part)
+        url = url_for('admin.orders_list', _anchor=f"orders-{obj.id}")
+    elif kind == 'room':
+        title = f"Private room: {obj.name}"
+        subtitle = f"{obj.email} • {obj.date} {obj.time}"
+        body = obj.message
+        url = url_for('admin.rooms_list', _anchor=f"rooms-{obj.id}")
+    else:
+        title = f"Event: {obj.event_type}"
+        subtitle = f"{obj.email} • {obj.date} • Guests: {obj.guests}"
+        body = obj.message
+        url = url_for('admin.events_list', _anchor=f"events-{obj.id}")
+    return {'kind': kind, 'id': obj.id, 'title': title, 'subtitle': subtitle, 'text': body or '', 'url': url}
+
+@admin_bp.route('/search')
+@admin_required
+def search():
+    q = request.args.get('q', '').strip()
+    kind = request.args.get('kind') or None
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = current_app.config['SEARCH_PAGE_SIZE']
+
+    hits, total = search_index.search(q, page=page, per_page=per_page, kind=kind)
+    results = [_search_result(k, obj) for k, obj in search_index.load(hits)]
+    pages = (total + per_page - 1) // per_page
+
+    if request.args.get('format') == 'json':
+        return jsonify({'query': q, 'page': page, 'pages': pages, 'total': total, 'results': results})
+    return render_template('admin/search.html', q=q, kind=kind, kinds=list(SEARCH_SOURCES),
+                           results=results, page=page, pages=pages, total=total)
+
+# ---- Request profiles (sampled / slow requests, newest first) ----
+@admin_bp.route('/profiles')
+@admin_required
+def profiles_list():
+    profiles = sorted(profiler.profiles, key=lambda p: p.id, reverse=True)
+    return render_template('admin/profiles.html', profiles=profiles, enabled=profiler.enabled)
+
+@admin_bp.route('/profiles/<int:profile_id>')
+@admin_required
+def profile_detail(profile_id):
+    profile = profiler.get(profile_id)
+    if profile is None:
+        abort(404)
+    return render_template('admin/profile_detail.html', profile=profile,
+                           top_stacks=profile.stacks.most_common(25))
+
+@admin_bp.route('/profiles/<int:profile_id>.folded')
+@admin_required
+def profile_folded(profile_id):
+    """Collapsed stacks for flamegraph.pl / speedscope."""
+    profile = profiler.get(profile_id)
+    if profile is None:
+        abort(404)
+    return Response(profile.folded() + "\n", mimetype='text/plain',
+                    headers={'Content-Disposition': f'attachment; filename=profile-{profile_id}.folded'})
@@ -0,0 +1,199 @@
+# backend/analytics.py
+"""
+Columnar sales snapshots and vectorised reports.
+
+``build_snapshot`` streams the Order table (``yield_per``) into one flat
+binary file per column — timestamps, totals and dictionary-encoded
+method/status codes — so reports never load ORM objects or touch the live
+database. ``load_snapshot`` memory-maps those files and ``sales_report``
+aggregates them with NumPy.
+
+Orders already moved out by the archiver are added from ``ArchiveRollup``:
+one row per (day, method, status) whose ``count`` column carries the number
+of orders it stands for, so totals keep covering the full history. Rollups
+have no time of day; they are flagged ``archived`` and left out of the
+by-hour breakdown.
+
+Snapshots live in versioned sub-directories of ANALYTICS_SNAPSHOT_DIR; a
+``LATEST`` file names the current one and is swapped atomically, so a report
+never sees a half-written snapshot. Run ``Scripts/snapshot_orders.py``
+nightly (cron) or use the "Refresh snapshot" button on /admin/reports.
+"""
+import itertools
+import json
+import os
+import shutil
+from datetime import datetime, time
+
+import numpy as np
+from sqlalchemy import literal
+
+from models import db, Order, ArchiveRollup
+
+COLUMN_DTYPES = {
+    'created_at': 'datetime64[s]',
+    'total': 'float64',
+    'method': 'uint16',
+    'status': 'uint16',
+    'count': 'uint32',     # orders the row stands for (1, or a rollup's count)
+    'archived': 'uint8',   # 1 for rows taken from ArchiveRollup
+}
+CATEGORICAL_COLUMNS = ('method', 'status')
+KEEP_SNAPSHOTS = 2
+
+
+class OrderSnapshot:
+    """Memory-mapped columns of one snapshot plus its category labels."""
+
+    def __init__(self, path, meta, columns):
+        self.path = path
+        self.meta = meta
+        self.columns = columns
+        self.labels = meta['labels']
+
+    @property
+    def rows(self):
+        return self.meta['rows']
+
+    @property
+    def generated_at(self):
+        return datetime.fromisoformat(self.meta['generated_at'])
+
+
+def _write_chunk(files, chunk):
+    for name, values in chunk.items():
+        np.asarray(values, dtype=COLUMN_DTYPES[name]).tofile(files[name])
+        values.clear()
+
+
+def build_snapshot(snapshot_dir, chunk_size=10000):
+    """Stream every order into a new columnar snapshot and make it current."""
+    os.makedirs(snapshot_dir, exist_ok=True)
+    generated_at = datetime.now()
+    name = f"orders-{generated_at.strftime('%Y%m%d%H%M%S%f')}"
+    path = os.path.join(snapshot_dir, name)
+    os.makedirs(path)
+
+    codes = {column: {} for column in CATEGORICAL_COLUMNS}
+    chunk = {column: [] for column in COLUMN_DTYPES}
+    files = {column: open(os.path.join(path, f"{column}.bin"), 'wb') for column in COLUMN_DTYPES}
+    rows = archived = 0
+    try:
+        live = (db.session.query(Order.created_at, Order.total, Order.method, Order.status,
+                                 literal(1), literal(0))
+                .order_by(Order.id)
+                .yield_per(chunk_size))
+        rollups = (db.session.query(ArchiveRollup.day, ArchiveRollup.revenue, ArchiveRollup.method,
+                                    ArchiveRollup.status, ArchiveRollup.count, literal(1))
+                   .filter(ArchiveRollup.kind == 'orders')
+                   .order_by(ArchiveRollup.day)
+                   .yield_per(chunk_size))
+        for created_at, total, method, status, count, is_archived in itertools.chain(live, rollups):
+            if is_archived:
+                created_at = datetime.combine(created_at, time.min)
+                archived += count or 0
+            chunk['created_at'].append(created_at)  # None becomes NaT
+            chunk['total'].append(total or 0.0)
+            chunk['count'].append(count or 0)
+            chunk['archived'].append(is_archived)
+            for column, value in (('method', method), ('status', status)):
+                label = value or 'Unknown'
+                chunk[column].append(codes[column].setdefault(label, len(codes[column])))
+            rows += 1
+            if len(chunk['total']) >= chunk_size:
+                _write_chunk(files, chunk)
+        _write_chunk(files, chunk)
+    finally:
+        for fh in files.values():
+            fh.close()
+        db.session.rollback()  # end the read transaction held open by yield_per
+
+    meta = {
+        'rows': rows,
+        'archived_orders': archived,
+        'generated_at': generated_at.isoformat(),
+        'dtypes': COLUMN_DTYPES,
+        'labels': {column: sorted(mapping, key=mapping.get) for column, mapping in codes.items()},
+    }
+    with open(os.path.join(path, 'meta.json'), 'w', encoding='utf-8') as fh:
+        json.dump(meta, fh)
+
+    latest_tmp = os.path.join(snapshot_dir, 'LATEST.tmp')
+    with open(latest_tmp, 'w', encoding='utf-8') as fh:
+        fh.write(name)
+    os.replace(latest_tmp, os.path.join(snapshot_dir, 'LATEST'))
+
+    _prune(snapshot_dir, keep=KEEP_SNAPSHOTS)
+    return meta
+
+
+def _prune(snapshot_dir, keep):
+    old = sorted(d for d in os.listdir(snapshot_dir) if d.startswith('orders-'))[:-keep]
+    for name in old:
+        shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+
+
+def load_snapshot(snapshot_dir):
+    """Memory-map the current snapshot, or return None if none has been built."""
+    try:
+        with open(os.path.join(snapshot_dir, 'LATEST'), encoding='utf-8') as fh:
+            path = os.path.join(snapshot_dir, fh.read().strip())
+        with open(os.path.join(path, 'meta.json'), encoding='utf-8') as fh:
+            meta = json.load(fh)
+    except FileNotFoundError:
+        return None
+
+    columns = {}
+    for column, dtype in meta['dtypes'].items():
+        if meta['rows'] == 0:
+            columns[column] = np.empty(0, dtype=dtype)  # np.memmap refuses empty files
+        else:
+            columns[column] = np.memmap(os.path.join(path, f"{column}.bin"), dtype=dtype,
+                                        mode='r', shape=(meta['rows'],))
+    return OrderSnapshot(path, meta, columns)
+
+
+def _grouped(codes, labels, totals, weights):
+    revenue = np.bincount(codes, weights=totals, minlength=len(labels))
+    counts = np.rint(np.bincount(codes, weights=weights, minlength=len(labels)))
+    return [
+        {'label': label, 'orders': int(counts[i]), 'revenue': round(float(revenue[i]), 2)}
+        for i, label in enumerate(labels)
+    ]
+
+
+def sales_report(snapshot, start=None, end=None):
+    """Revenue and order counts by day, method, status and hour of day.
+
+    ``start`` / ``end`` are optional ``date`` bounds (inclusive).
+    """
+    created_at = snapshot.columns['created_at']
+    mask = ~np.isnat(created_at)
+    if start is not None:
+        mask &= created_at >= np.datetime64(start, 's')
+    if end is not None:
+        mask &= created_at < np.datetime64(end, 'D') + np.timedelta64(1, 'D')
+
+    created_at = created_at[mask]
+    totals = snapshot.columns['total'][mask]
+    # snapshots written before archived rollups were merged have neither column
+    counts = snapshot.columns['count'][mask] if 'count' in snapshot.columns else np.ones(totals.size)
+    archived = (snapshot.columns['archived'][mask].astype(bool) if 'archived' in snapshot.columns
+                else np.zeros(totals.size, dtype=bool))
+    days = created_at.astype('datetime64[D]')
+
+    day_values, day_codes = np.unique(days, return_inverse=True)
+    day_labels = [str(day) for day in day_values]
+    live = ~archived
+    hours = ((created_at[live] - days[live]) // np.timedelta64(1, 'h')).astype(np.intp)
+
+    return {
+        'rows': int(counts.sum()),
+        'archived_orders': int(counts[archived].sum()),
+        'revenue': round(float(totals.sum()), 2),
+        'generated_at': snapshot.meta['generated_at'],
+        'by_day': _grouped(day_codes.ravel(), day_labels, totals, counts),
+        'by_method': _grouped(snapshot.columns['method'][mask], snapshot.labels['method'], totals, counts),
+        'by_status': _grouped(snapshot.columns['status'][mask], snapshot.labels['status'], totals, counts),
+        'by_hour': _grouped(hours, [f"{h:02d}:00" for h in range(24)], totals[live], counts[live]),
+    }
@@ -1,4 +1,4 @@
-from flask import Flask, render_template, request, g
+from flask import Flask, render_template, g
 from flask_cors import CORS
 from flask_mail import Mail
 from config import Config
@@ -6,10 +6,20 @@ from models import db
 from auth import auth_bp, mail as auth_mail
 from customer import customer_bp
 from admin import admin_bp
+from write_behind import write_behind
+from order_cache import order_history_cache, ensure_history_index
+from search import search_index
+from assets import assets
+from order_status import ensure_queue_indexes
+from profiling import profiler
+from structured_logging import request_logging
 from sqlalchemy import text
+import logging
 import os
 import time
 
+logger = logging.getLogger(__name__)
+
 # =====================================================
 # 🧩 App Factory
 # =====================================================
@@ -17,12 +27,18 @@ def create_app():
     app = Flask(__name__, static_folder="../static", template_folder="../templates")
     app.config.from_object(Config)
 
+    # ✅ Structured logging first, so start-up messages go through it too
+    request_logging.init_app(app)
+
     # ✅ Enable CORS globally
     CORS(app, supports_credentials=True)
 
     # ✅ Initialize extensions
     db.init_app(app)
     auth_mail.init_app(app)
+    order_history_cache.init_app(app)
+    assets.init_app(app)
+    profiler.init_app(app)
 
     # ✅ Register Blueprints
     app.register_blueprint(auth_bp)
@@ -32,6 +48,14 @@ def create_app():
     # ✅ Create tables safely
     with app.app_context():
         db.create_all()
+        ensure_queue_indexes()
+        ensure_history_index()
+
+    # ✅ Full-text search index (FTS5 on SQLite, GIN on Postgres)
+    search_index.init_app(app)
+
+    # ✅ Opt-in write-behind buffer (replays any leftover spool on start-up)
+    write_behind.init_app(app)
 
     # ✅ Define main route
     @app.route('/')
@@ -39,13 +63,13 @@ def create_app():
         dishes = [
         {"id":1,"name": "Truffle Risotto", "price": 18.99, "category": "startters",
          "description": "Vegitable Salad with fresh ingredients.",
-         "image": "/static/images/vegitable_salad.jpg"},
+         "image": assets.url("images/vegitable_salad.jpg")},
         {"id":2,"name": "Grilled Salmon", "price": 22.49, "category": "main-course",
          "description": "Delicious Crispy Sweet Corn butter sauce.",
-         "image": "/static/images/Sweet_Corn.jpg"},
+         "image": assets.url("images/Sweet_Corn.jpg")},
         {"id":3,"name": "Tiramisu", "price": 8.99, "category": "desserts",
          "description": "Classic Italian dessert with mascarpone and cocoa.",
-         "image": "/static/images/tiramisu.jpg"}
+         "image": assets.url("images/tiramisu.jpg")}
         ]
         return render_template('index.html', dishes=dishes)
 
@@ -67,6 +91,7 @@ def inject_auth_state():
     from flask import session
     return {
         "is_authenticated": bool(session.get("user_id")),
+        "user_id": session.get("user_id"),
         "user_email": session.get("email"),
         "user_role": session.get("role")
     }
@@ -85,7 +110,7 @@ def db_health_check():
         db.session.execute(text("SELECT 1"))
         g.db_latency = round((time.time() - start) * 1000, 2)
     except Exception as e:
-        print("❌ Database connection issue detected:", e)
+        logger.error("Database connection issue detected: %s", e)
         g.db_latency = None
 
 
@@ -94,9 +119,9 @@ def log_db_status(response):
     """Log DB connection health (only when DEBUG=True)."""
     if os.getenv("DEBUG", "False").lower() in ["true", "1", "t"]:
         if hasattr(g, "db_latency") and g.db_latency is not None:
-            print(f"✅ DB OK | Query latency: {g.db_latency} ms | Path: {request.path}")
+            logger.debug("DB OK", extra={'db_latency_ms': g.db_latency})
         else:
-            print(f"⚠️ DB check skipped or failed | Path: {request.path}")
+            logger.warning("DB check skipped or failed")
     return response
 
 
@@ -111,19 +136,18 @@ def db_check():
         count = User.query.count()
         return f"✅ Database Connected! Found {count} users."
     except Exception as e:
-        print(f"❌ DB Error: {e}")
+        logger.exception("DB check failed")
         return f"❌ DB Error: {e}"
 
 
 # =====================================================
-# 🧩 Environment Debug (Print Once)
+# 🧩 Environment Debug (Logged Once)
 # =====================================================
 if os.getenv("DEBUG", "False").lower() in ["true", "1", "t"]:
-    print("///////////////////////////////////////////////////////////")
-    print("🧩 DEBUG ENV TEST:")
-    print("MAIL USER:", os.getenv("MAIL_USERNAME"))
-    print("DB URL:", os.getenv("DATABASE_URL"))
-    print("///////////////////////////////////////////////////////////")
+    logger.info("Debug environment", extra={
+        'mail_user': os.getenv("MAIL_USERNAME"),
+        'database_url': os.getenv("DATABASE_URL"),  # credentials are redacted
+    })
 
 
 # =====================================================
@@ -0,0 +1,153 @@
+# backend/archive.py
+"""
+Retention for orders, private-room bookings and events.
+
+``archive_older_than`` moves rows created before the horizon into gzipped
+NDJSON files under ARCHIVE_DIR/<kind>/ and deletes them from the hot tables,
+one chunk (ARCHIVE_CHUNK_SIZE rows) per transaction so no lock is held for
+long. Each chunk also folds its rows into ``ArchiveRollup`` (per day, method
+and status) so totals stay available without reading the files. Only closed
+orders (Delivered / Cancelled) are archived; active ones stay in the queue.
+
+Chunk files are named ``<first id>-<last id>.ndjson.gz``: if a run dies after
+writing a file but before committing the delete, the next run rewrites the
+same file instead of duplicating it.
+
+``iter_archived`` reads the files back lazily, newest first, for the admin
+"include archived" listings and the customer's "older orders" view.
+"""
+import gzip
+import json
+import os
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+from sqlalchemy import DateTime, func
+
+from models import db, Order, PrivateRoom, Event, OrderStatusEvent, ArchiveRollup
+from order_status import ACTIVE_STATUSES
+
+# listing kind -> model
+ARCHIVE_SOURCES = {
+    'orders': Order,
+    'rooms': PrivateRoom,
+    'events': Event,
+}
+
+
+def _encode(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot archive value of type {type(value).__name__}")
+
+
+def _row_dict(obj):
+    return {column.name: getattr(obj, column.name) for column in obj.__table__.columns}
+
+
+def _chunk_path(archive_dir, kind, first_id, last_id):
+    return os.path.join(archive_dir, kind, f"{first_id:010d}-{last_id:010d}.ndjson.gz")
+
+
+def _write_chunk(path, rows):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.tmp'
+    with gzip.open(tmp, 'wt', encoding='utf-8') as fh:
+        for row in rows:
+            fh.write(json.dumps(row, default=_encode) + "\n")
+    with open(tmp, 'rb') as fh:
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+
+def _add_rollups(kind, objs):
+    totals = {}
+    for obj in objs:
+        key = (
+            (obj.created_at or datetime.now()).date(),
+            getattr(obj, 'method', None) or '',
+            getattr(obj, 'status', None) or '',
+        )
+        count, revenue = totals.get(key, (0, 0.0))
+        totals[key] = (count + 1, revenue + (getattr(obj, 'total', None) or 0.0))
+
+    for (day, method, status), (count, revenue) in totals.items():
+        rollup = ArchiveRollup.query.filter_by(kind=kind, day=day, method=method, status=status).first()
+        if rollup is None:
+            rollup = ArchiveRollup(kind=kind, day=day, method=method, status=status, count=0, revenue=0.0)
+            db.session.add(rollup)
+        rollup.count += count
+        rollup.revenue += revenue
+
+
+def archive_kind(kind, cutoff, archive_dir, chunk_size=1000):
+    """Archive rows of one kind created before ``cutoff``. Returns rows moved."""
+    model = ARCHIVE_SOURCES[kind]
+    moved = 0
+    while True:
+        query = model.query.filter(model.created_at < cutoff)
+        if model is Order:
+            query = query.filter(Order.status.notin_(ACTIVE_STATUSES))
+        objs = query.order_by(model.id).limit(chunk_size).all()
+        if not objs:
+            return moved
+
+        ids = [obj.id for obj in objs]
+        rows = [_row_dict(obj) for obj in objs]
+        if model is Order:
+            events = {}
+            for event in (OrderStatusEvent.query.filter(OrderStatusEvent.order_id.in_(ids))
+                          .order_by(OrderStatusEvent.created_at)):
+                events.setdefault(event.order_id, []).append(_row_dict(event))
+            for row in rows:
+                row['status_events'] = events.get(row['id'], [])
+
+        path = _chunk_path(archive_dir, kind, ids[0], ids[-1])
+        _write_chunk(path, rows)
+        try:
+            _add_rollups(kind, objs)
+            if model is Order:
+                OrderStatusEvent.query.filter(OrderStatusEvent.order_id.in_(ids)).delete(synchronize_session=False)
+            model.query.filter(model.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            os.remove(path)
+            raise
+        db.session.expunge_all()
+        moved += len(ids)
+
+
+def archive_older_than(days, archive_dir, chunk_size=1000):
+    """Archive every kind; returns ``{kind: rows moved}``."""
+    cutoff = datetime.now() - timedelta(days=days)
+    return {kind: archive_kind(kind, cutoff, archive_dir, chunk_size) for kind in ARCHIVE_SOURCES}
+
+
+def _decode(model, row):
+    for column in model.__table__.columns:
+        if isinstance(column.type, DateTime) and isinstance(row.get(column.name), str):
+            row[column.name] = datetime.fromisoformat(row[column.name])
+    return SimpleNamespace(archived=True, **row)
+
+
+def iter_archived(kind, archive_dir):
+    """Yield archived rows of ``kind`` newest first, one chunk file at a time."""
+    model = ARCHIVE_SOURCES[kind]
+    folder = os.path.join(archive_dir, kind)
+    try:
+        names = sorted((n for n in os.listdir(folder) if n.endswith('.ndjson.gz')), reverse=True)
+    except FileNotFoundError:
+        return
+    for name in names:
+        with gzip.open(os.path.join(folder, name), 'rt', encoding='utf-8') as fh:
+            rows = [json.loads(line) for line in fh]
+        for row in reversed(rows):
+            yield _decode(model, row)
+
+
+def archived_counts():
+    """Rows archived so far per kind, from the rollups."""
+    counts = dict(db.session.query(ArchiveRollup.kind, func.sum(ArchiveRollup.count))
+                  .group_by(ArchiveRollup.kind))
+    return {kind: int(counts.get(kind) or 0) for kind in ARCHIVE_SOURCES}
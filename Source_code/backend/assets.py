@@ -0,0 +1,135 @@
+# backend/assets.py
+"""
+Fingerprinted, precompressed static assets.
+
+``build_assets`` (run by ``Scripts/build_assets.py`` at deploy time) copies
+every file under ``static/css``, ``static/js`` and ``static/images`` into
+``static/dist`` with a content hash in its name, writes ``.gz`` (and ``.br``
+when the ``brotli`` package is installed) siblings for text assets and
+records everything in ``static/dist/manifest.json``.
+
+At runtime ``AssetPipeline`` loads that manifest, exposes ``asset_url`` to
+templates and serves ``/static/dist/...`` with the best
+precompressed encoding the client accepts and an immutable one-year
+``Cache-Control``. Without a manifest ``asset_url`` falls back to the plain
+``static`` endpoint, so development works without a build step.
+"""
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from flask import request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip siblings are written
+    brotli = None
+
+SOURCE_DIRS = ('css', 'js', 'images')
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+COMPRESSIBLE = {'.css', '.js', '.svg', '.json', '.txt', '.html'}
+ONE_YEAR = 60 * 60 * 24 * 365
+
+
+def _fingerprint(data):
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+def _write_hashed(dist_dir, logical, data, suffix=''):
+    """Write ``data`` under a content-hashed name derived from ``logical``."""
+    stem, ext = os.path.splitext(logical)
+    hashed = f"{stem}{suffix}.{_fingerprint(data)}{ext}"
+    target = os.path.join(dist_dir, hashed)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as fh:
+        fh.write(data)
+
+    if ext.lower() in COMPRESSIBLE:
+        with open(target + '.gz', 'wb') as fh:
+            fh.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(target + '.br', 'wb') as fh:
+                fh.write(brotli.compress(data, quality=11))
+    return hashed.replace(os.sep, '/')
+
+
+def build_assets(static_dir):
+    """Rebuild ``static/dist`` and its manifest. Returns the manifest dict."""
+    dist_dir = os.path.join(static_dir, DIST_DIR)
+    staging = dist_dir + '.tmp'
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging)
+
+    manifest = {'files': {}}
+    for source in SOURCE_DIRS:
+        root = os.path.join(static_dir, source)
+        for dirpath, _dirnames, filenames in os.walk(root):
+            for filename in sorted(filenames):
+                path = os.path.join(dirpath, filename)
+                logical = os.path.relpath(path, static_dir).replace(os.sep, '/')
+                with open(path, 'rb') as fh:
+                    data = fh.read()
+                manifest['files'][logical] = _write_hashed(staging, logical, data)
+
+    with open(os.path.join(staging, MANIFEST), 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+
+    shutil.rmtree(dist_dir, ignore_errors=True)
+    os.replace(staging, dist_dir)
+    return manifest
+
+
+class AssetPipeline:
+
+    def __init__(self, app=None):
+        self.files = {}
+        self.dist_dir = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.dist_dir = os.path.join(app.static_folder, DIST_DIR)
+        self.load_manifest()
+        app.extensions['assets'] = self
+        app.add_url_rule(f"{app.static_url_path}/{DIST_DIR}/<path:filename>",
+                         endpoint='hashed_static', view_func=self.serve)
+        app.jinja_env.globals.update(asset_url=self.url)
+
+    def load_manifest(self):
+        try:
+            with open(os.path.join(self.dist_dir, MANIFEST), encoding='utf-8') as fh:
+                manifest = json.load(fh)
+        except FileNotFoundError:
+            manifest = {}
+        self.files = manifest.get('files', {})
+
+    def url(self, filename):
+        """URL of the fingerprinted copy of ``filename`` (falls back to /static)."""
+        hashed = self.files.get(filename)
+        if hashed is None:
+            return url_for('static', filename=filename)
+        return url_for('hashed_static', filename=hashed)
+
+    def serve(self, filename):
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        accepted = request.accept_encodings
+        encoding = None
+        for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if accepted[candidate] and os.path.isfile(os.path.join(self.dist_dir, filename + suffix)):
+                encoding = candidate
+                filename += suffix
+                break
+
+        response = send_from_directory(self.dist_dir, filename, mimetype=mimetype, max_age=ONE_YEAR)
+        response.headers['Cache-Control'] = f"public, max-age={ONE_YEAR}, immutable"
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        return response
+
+
+assets = AssetPipeline()
@@ -6,8 +6,10 @@ from flask_mail import Mail
 import random
 import string
 import os
+import logging
 
 auth_bp = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
 mail = Mail()
 
 # Temporary in-memory OTP store (replace with Redis or DB in production)
@@ -128,17 +130,17 @@ def send_otp():
         )
 
         if res.status_code == 201:
-            print(f"✅ OTP email sent successfully to {email}")
+            logger.info("OTP email sent", extra={'user_id': user.id})
             return jsonify({'success': True, 'message': '✅ OTP sent successfully! Please check your email.'}), 200
         else:
-            print(f"⚠️ Brevo API error {res.status_code}: {res.text}")
-            print(f"🔄 Fallback OTP for {email}: {otp}")
-            return jsonify({'success': True, 'message': '⚠️ Email failed, OTP logged in Render logs.'}), 200
-
-    except Exception as e:
-        print(f"❌ Error sending OTP: {e}")
-        print(f"🔄 Fallback OTP for {email}: {otp}")
-        return jsonify({'success': True, 'message': '⚠️ Network issue — OTP logged in Render logs.'}), 200
+            logger.error("Brevo API error %s: %s", res.status_code, res.text, extra={'user_id': user.id})
+
+    except Exception:
+        logger.exception("Error sending OTP email", extra={'user_id': user.id})
+
+    # ❌ Never fall back to logging the code itself
+    otp_store.pop(email, None)
+    return jsonify({'success': False, 'message': '⚠️ Could not send the OTP email right now. Please try again shortly.'}), 502
 
 
 # ====================================================
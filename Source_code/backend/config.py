@@ -4,6 +4,13 @@ from dotenv import load_dotenv
 # ✅ Load environment variables from .env (for local dev)
 load_dotenv()
 
+# Data directories resolve relative to this folder, so the app and the cron
+# scripts (which run from the repo root) agree on where files live.
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def data_dir(env_name, default):
+    return os.path.join(BASE_DIR, os.getenv(env_name, default))
+
 class Config:
     # -------------------------------
     # 🔐 Security & Core Settings
@@ -48,6 +55,85 @@ class Config:
     SESSION_PERMANENT = True
     PERMANENT_SESSION_LIFETIME = 60 * 60 * 24 * 7  # 7 days
 
+    # -------------------------------
+    # 📝 Write-behind Order Buffer (opt-in)
+    # -------------------------------
+    # When enabled, orders / room bookings / event reservations are acknowledged
+    # with a provisional id, spooled to a local append-only file and inserted in
+    # batches once WRITE_BEHIND_BATCH_SIZE rows are pending or every
+    # WRITE_BEHIND_FLUSH_INTERVAL seconds, whichever comes first.
+    WRITE_BEHIND_ENABLED = os.getenv('WRITE_BEHIND_ENABLED', 'False').lower() in ['true', '1', 't']
+    WRITE_BEHIND_BATCH_SIZE = int(os.getenv('WRITE_BEHIND_BATCH_SIZE', '200'))
+    WRITE_BEHIND_FLUSH_INTERVAL = float(os.getenv('WRITE_BEHIND_FLUSH_INTERVAL', '1.0'))
+    WRITE_BEHIND_SPOOL_DIR = data_dir('WRITE_BEHIND_SPOOL_DIR', 'write_behind_spool')
+    WRITE_BEHIND_FSYNC = os.getenv('WRITE_BEHIND_FSYNC', 'False').lower() in ['true', '1', 't']
+
+    # -------------------------------
+    # 🗂️ Order History Page Cache
+    # -------------------------------
+    # Rendered /customer/orders pages are cached per user and only served
+    # while a cheap per-request version probe still matches, so workers never
+    # serve a stale page. The TTL just bounds memory held by idle users.
+    ORDER_HISTORY_CACHE_ENABLED = os.getenv('ORDER_HISTORY_CACHE_ENABLED', 'True').lower() in ['true', '1', 't']
+    ORDER_HISTORY_CACHE_TTL = int(os.getenv('ORDER_HISTORY_CACHE_TTL', '300'))
+    ORDER_HISTORY_CACHE_SIZE = int(os.getenv('ORDER_HISTORY_CACHE_SIZE', '1000'))
+
+    # -------------------------------
+    # 📊 Sales Analytics Snapshots
+    # -------------------------------
+    ANALYTICS_SNAPSHOT_DIR = data_dir('ANALYTICS_SNAPSHOT_DIR', 'analytics_snapshots')
+    ANALYTICS_CHUNK_SIZE = int(os.getenv('ANALYTICS_CHUNK_SIZE', '10000'))
+
+    # -------------------------------
+    # 📦 Batch API (/customer/api/batch)
+    # -------------------------------
+    BATCH_MAX_OPERATIONS = int(os.getenv('BATCH_MAX_OPERATIONS', '50'))
+
+    # -------------------------------
+    # 🍳 Kitchen Queue
+    # -------------------------------
+    KITCHEN_METRICS_WINDOW_HOURS = float(os.getenv('KITCHEN_METRICS_WINDOW_HOURS', '24'))
+
+    # -------------------------------
+    # 🗄️ Data Retention / Archival
+    # -------------------------------
+    # Scripts/archive_old_records.py moves closed orders, room bookings and
+    # events older than the horizon into gzipped NDJSON files in ARCHIVE_DIR.
+    ARCHIVE_DIR = data_dir('ARCHIVE_DIR', 'archive')
+    ARCHIVE_HORIZON_DAYS = int(os.getenv('ARCHIVE_HORIZON_DAYS', '365'))
+    ARCHIVE_CHUNK_SIZE = int(os.getenv('ARCHIVE_CHUNK_SIZE', '1000'))
+    ARCHIVE_PAGE_SIZE = int(os.getenv('ARCHIVE_PAGE_SIZE', '50'))
+
+    # -------------------------------
+    # 🔎 Admin Search
+    # -------------------------------
+    SEARCH_PAGE_SIZE = int(os.getenv('SEARCH_PAGE_SIZE', '20'))
+
+    # -------------------------------
+    # 🔬 Request Profiling (view at /admin/profiles)
+    # -------------------------------
+    # Profiles PROFILE_SAMPLE_RATE of requests plus every request slower than
+    # PROFILE_SLOW_MS (0 disables the slow-request capture).
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False').lower() in ['true', '1', 't']
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0.01'))
+    PROFILE_SLOW_MS = float(os.getenv('PROFILE_SLOW_MS', '500'))
+    PROFILE_INTERVAL_MS = float(os.getenv('PROFILE_INTERVAL_MS', '5'))
+    PROFILE_BUFFER_SIZE = int(os.getenv('PROFILE_BUFFER_SIZE', '100'))
+    PROFILE_MAX_SQL = int(os.getenv('PROFILE_MAX_SQL', '200'))
+
+    # -------------------------------
+    # 📝 Logging (JSON lines on stdout, written by a background thread)
+    # -------------------------------
+    # Requests under LOG_SAMPLE_PATHS keep only LOG_SAMPLE_RATE of their
+    # INFO/DEBUG records; warnings and errors are always logged.
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')  # 'json' or 'text'
+    LOG_ACCESS = os.getenv('LOG_ACCESS', 'True').lower() in ['true', '1', 't']
+    LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+    LOG_SAMPLE_PATHS = [p.strip() for p in os.getenv('LOG_SAMPLE_PATHS', '/static/,/customer/orders').split(',') if p.strip()]
+    LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.1'))
+    REQUEST_ID_HEADER = os.getenv('REQUEST_ID_HEADER', 'X-Request-ID')
+
     # -------------------------------
     # 🧠 Debug
     # -------------------------------
@@ -1,8 +1,193 @@
 # backend/customer.py
-from flask import Blueprint, render_template, jsonify, session, redirect, url_for, request, flash
-from models import db, Order, PrivateRoom, Event, User
+from flask import Blueprint, render_template, jsonify, session, redirect, url_for, request, flash, make_response, current_app
+from models import db, Order, PrivateRoom, Event, User, IdempotencyKey
+from sqlalchemy.exc import IntegrityError
+from order_cache import order_history_cache, orders_version
+from write_behind import write_behind
+from archive import iter_archived
+from itertools import islice
+import logging
+import math
 
 customer_bp = Blueprint('customer', __name__, url_prefix='/customer')
+logger = logging.getLogger(__name__)
+
+# ----------------------------------------------------
+# Payload -> column mapping (shared by single + batch endpoints)
+# ----------------------------------------------------
+def _order_fields(data, user_id):
+    delivery = data.get('delivery') or {}
+    if not isinstance(delivery, dict):
+        raise ValueError("delivery must be an object.")
+    return dict(
+        customer_id=user_id,
+        items=data.get('items', []),
+        total=data.get('total', 0.0),
+        method=delivery.get('method', 'Pickup'),
+        address=delivery.get('address', ''),
+        special_requests=delivery.get('specialRequests', '')
+    )
+
+
+def _private_room_fields(data, user_id):
+    return dict(
+        customer_id=user_id,
+        name=data.get('name', 'Anonymous'),
+        email=data.get('email', ''),
+        date=data.get('date', ''),
+        time=data.get('time', ''),
+        # the booking form posts "message"; older clients sent "specialRequests"
+        message=data.get('specialRequests', data.get('message', ''))
+    )
+
+
+def _event_fields(data, user_id):
+    return dict(
+        customer_id=user_id,
+        name=data.get('name', 'Anonymous'),
+        email=data.get('email', ''),
+        event_type=data.get('event_type', ''),
+        guests=data.get('guests', 0),
+        date=data.get('date', ''),
+        message=data.get('message', '')
+    )
+
+
+def _check_fields(model, fields):
+    """Coerce ``fields`` to ``model``'s column types before the row is accepted.
+
+    Raises ValueError naming the first bad field, so nothing that would fail
+    at INSERT time (NOT NULL, type, length) is ever acknowledged — in
+    particular not by the write-behind buffer, which answers before inserting.
+    """
+    clean = {}
+    for name, value in fields.items():
+        column = model.__table__.columns[name]
+        if value == '' and not isinstance(column.type, db.String):
+            value = None  # blank optional form input
+        if value is None:
+            if not column.nullable:
+                raise ValueError(f"{name} is required.")
+            clean[name] = None
+            continue
+
+        if isinstance(column.type, db.JSON):
+            if not isinstance(value, (list, dict)):
+                raise ValueError(f"{name} must be a list.")
+        elif isinstance(column.type, db.Integer):
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise ValueError(f"{name} must be a whole number.")
+            try:
+                number = float(value)
+            except ValueError:
+                raise ValueError(f"{name} must be a whole number.") from None
+            if not number.is_integer():
+                raise ValueError(f"{name} must be a whole number.")
+            value = int(number)
+        elif isinstance(column.type, db.Float):
+            if isinstance(value, bool) or not isinstance(value, (int, float, str)):
+                raise ValueError(f"{name} must be a number.")
+            try:
+                value = float(value)
+            except ValueError:
+                raise ValueError(f"{name} must be a number.") from None
+            if not math.isfinite(value):
+                raise ValueError(f"{name} must be a number.")
+        elif isinstance(column.type, db.String):
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                value = str(value)
+            if not isinstance(value, str):
+                raise ValueError(f"{name} must be text.")
+            if column.type.length and len(value) > column.type.length:
+                raise ValueError(f"{name} must be at most {column.type.length} characters.")
+        clean[name] = value
+
+    if model is Order and not clean.get('items'):
+        raise ValueError("An order needs at least one item.")
+    return clean
+
+
+# operation type -> (model, field builder, id key in the response)
+BATCH_OPERATIONS = {
+    'order': (Order, _order_fields, 'order_id'),
+    'private_room': (PrivateRoom, _private_room_fields, 'booking_id'),
+    'event': (Event, _event_fields, 'event_id'),
+}
+
+
+def _client_id(value):
+    """Validate an optional client-chosen operation id (idempotency key)."""
+    if value is None:
+        return None
+    if not isinstance(value, str) or not 0 < len(value) <= 64:
+        raise ValueError("client_id must be a string of at most 64 characters.")
+    return value
+
+
+def _receipts(user_id, keys):
+    """Existing idempotency receipts of ``user_id`` for ``keys``, by key."""
+    keys = [key for key in keys if key]
+    if not keys:
+        return {}
+    return {r.key: r for r in IdempotencyKey.query.filter(IdempotencyKey.user_id == user_id,
+                                                          IdempotencyKey.key.in_(keys))}
+
+
+def _replay(receipt, model, id_key):
+    if receipt.kind != model.__name__:
+        return jsonify({'success': False, 'error': 'client_id was already used for a different request.'}), 409
+    return jsonify({'success': True, id_key: receipt.record_id, 'replayed': True}), 200
+
+
+def _save_new(model, fields, id_key, client_id=None):
+    """Insert a new row now, or hand it to the write-behind buffer when enabled.
+
+    With a ``client_id`` the request is safe to retry: a repeat returns the
+    row created the first time instead of inserting another one.
+    """
+    try:
+        fields = _check_fields(model, fields)
+        client_id = _client_id(client_id)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+    user_id = fields['customer_id']
+    receipt = _receipts(user_id, [client_id]).get(client_id)
+    if receipt is not None:
+        return _replay(receipt, model, id_key)
+
+    if write_behind.enabled:
+        provisional_id = write_behind.submit(model, fields, idempotency_key=client_id)
+        return jsonify({'success': True, id_key: provisional_id, 'provisional': True}), 202
+
+    record = model(**fields)
+    db.session.add(record)
+    try:
+        if client_id:
+            db.session.flush()
+            db.session.add(IdempotencyKey(user_id=user_id, key=client_id, kind=model.__name__, record_id=record.id))
+        db.session.commit()
+    except IntegrityError:
+        # a concurrent retry with the same client_id got there first
+        db.session.rollback()
+        receipt = _receipts(user_id, [client_id]).get(client_id)
+        if receipt is None:
+            raise
+        return _replay(receipt, model, id_key)
+    if model is Order:
+        order_history_cache.invalidate(record.customer_id)
+    return jsonify({'success': True, id_key: record.id}), 201
+
+
+def _invalidate_flushed_orders(records):
+    """Drop cached order pages for customers whose buffered orders just landed."""
+    order_history_cache.invalidate(*{
+        r['row'].get('customer_id') for r in records if r['model'] == 'Order'
+    })
+
+
+write_behind.add_flush_listener(_invalidate_flushed_orders)
+
 
 # ============================
 # 📦 CUSTOMER ORDERS PAGE
@@ -16,14 +201,44 @@ def customer_orders():
         flash("Please login first to view your orders.")
         return redirect(url_for('auth.otp_login'))
 
-    # ✅ If you have an Order model — show actual data
-    try:
-        orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
-    except Exception as e:
-        print("⚠️ DB Error loading orders:", e)
-        orders = []
+    if request.args.get('archived') == '1':
+        return _orders_with_archived(user_id)
 
-    return render_template('customer_orders.html', orders=orders)
+    # ✅ Serve the cached page (or a 304) while the user's orders are unchanged
+    try:
+        version = orders_version(user_id)
+        page = order_history_cache.get(user_id, version)
+        if page is None:
+            orders = Order.query.filter_by(customer_id=user_id).order_by(Order.created_at.desc()).all()
+            html = render_template('customer_orders.html', orders=orders)
+            page = order_history_cache.set(user_id, html, version)
+    except Exception:
+        logger.exception("DB error loading orders")
+        return render_template('customer_orders.html', orders=[])
+
+    response = make_response(page.html)
+    response.set_etag(page.etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
+
+
+def _orders_with_archived(user_id):
+    """The orders page plus one page of the user's archived orders (not cached)."""
+    archive_page = max(request.args.get('archive_page', 1, type=int), 1)
+    size = current_app.config['ARCHIVE_PAGE_SIZE']
+    start = (archive_page - 1) * size
+    try:
+        orders = Order.query.filter_by(customer_id=user_id).order_by(Order.created_at.desc()).all()
+        # the archive is not indexed by customer, so this reads chunk files until the page is full
+        own = (row for row in iter_archived('orders', current_app.config['ARCHIVE_DIR'])
+               if row.customer_id == user_id)
+        archived_orders = list(islice(own, start, start + size + 1))
+    except Exception:
+        logger.exception("Error loading archived orders")
+        return render_template('customer_orders.html', orders=[])
+    return render_template('customer_orders.html', orders=orders, include_archived=True,
+                           archived_orders=archived_orders[:size], archive_page=archive_page,
+                           more_archived=len(archived_orders) > size)
 
 
 # ----------------------------------------------------
@@ -67,7 +282,8 @@ def get_customer_data():
     private_rooms = PrivateRoom.query.filter_by(customer_id=user_id).all()
     events = Event.query.filter_by(customer_id=user_id).all()
 
-    print("DEBUG:", user_id, len(orders), len(private_rooms), len(events))  # 🧩 debug info
+    logger.debug("Dashboard data loaded", extra={
+        'user_id': user_id, 'orders': len(orders), 'private_rooms': len(private_rooms), 'events': len(events)})
 
     def serialize(model_obj):
         return {col.name: getattr(model_obj, col.name) for col in model_obj.__table__.columns}
@@ -94,20 +310,12 @@ def create_order():
         return jsonify({'login_required': True, 'message': 'Please login to place an order.'}), 401
 
     try:
-        new_order = Order(
-            customer_id=session['user_id'],
-            items=data.get('items', []),
-            total=data.get('total', 0.0),
-            method=data.get('delivery', {}).get('method', 'Pickup'),
-            address=data.get('delivery', {}).get('address', ''),
-            special_requests=data.get('delivery', {}).get('specialRequests', '')
-        )
-        db.session.add(new_order)
-        db.session.commit()
-        return jsonify({'success': True, 'order_id': new_order.id}), 201
+        return _save_new(Order, _order_fields(data, session['user_id']), 'order_id', data.get('client_id'))
 
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
     except Exception as e:
-        print("Error creating order:", e)
+        logger.exception("Error creating order")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -121,20 +329,11 @@ def book_private_room():
             return jsonify({'login_required': True, 'message': 'Please login to book a private room.'}), 401
 
         data = request.get_json()
-        new_booking = PrivateRoom(
-            customer_id=session['user_id'],
-            name=data.get('name', 'Anonymous'),
-            email=data.get('email', ''),
-            date=data.get('date', ''),
-            time=data.get('time', ''),
-            message=data.get('specialRequests', '')
-        )
-        db.session.add(new_booking)
-        db.session.commit()
-        return jsonify({'success': True, 'booking_id': new_booking.id}), 201
+        return _save_new(PrivateRoom, _private_room_fields(data, session['user_id']), 'booking_id',
+                         data.get('client_id'))
 
     except Exception as e:
-        print("Error booking private room:", e)
+        logger.exception("Error booking private room")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
@@ -148,26 +347,106 @@ def event_reservation():
             return jsonify({'login_required': True, 'message': 'Please login to reserve an event.'}), 401
 
         data = request.get_json()
-        new_event = Event(
-            customer_id=session['user_id'],
-            name=data.get('name', 'Anonymous'),
-            email=data.get('email', ''),
-            event_type=data.get('event_type', ''),
-            guests=data.get('guests', 0),
-            date=data.get('date', ''),
-            message=data.get('message', '')
-        )
-        db.session.add(new_event)
-        db.session.commit()
-        return jsonify({'success': True, 'event_id': new_event.id}), 201
+        return _save_new(Event, _event_fields(data, session['user_id']), 'event_id', data.get('client_id'))
 
     except Exception as e:
-        print("Error booking event:", e)
+        logger.exception("Error booking event")
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 # ----------------------------------------------------
-# 7️⃣ Debug Route (Optional)
+# 7️⃣ Batch Submit (orders / rooms / events in one transaction)
+# ----------------------------------------------------
+@customer_bp.route('/api/batch', methods=['POST'])
+def batch_operations():
+    if not session.get('user_id'):
+        return jsonify({'login_required': True, 'message': 'Please login to continue.'}), 401
+
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'success': False, 'error': 'Expected a non-empty "operations" list.'}), 400
+    max_ops = current_app.config['BATCH_MAX_OPERATIONS']
+    if len(operations) > max_ops:
+        return jsonify({'success': False, 'error': f'At most {max_ops} operations per batch.',
+                        'max_operations': max_ops}), 400
+
+    # Validate everything first — the batch is all-or-nothing, so anything
+    # that would fail at INSERT time is reported per operation as a 400
+    user_id = session['user_id']
+    pending, errors, seen = [], [], set()
+    for index, op in enumerate(operations):
+        op = op if isinstance(op, dict) else {}
+        kind, payload = op.get('type'), op.get('payload')
+        if kind not in BATCH_OPERATIONS:
+            errors.append({'index': index, 'error': f'Unknown operation type: {kind!r}'})
+            continue
+        if not isinstance(payload, dict):
+            errors.append({'index': index, 'error': 'Operation payload must be an object.'})
+            continue
+        model, build_fields, id_key = BATCH_OPERATIONS[kind]
+        try:
+            client_id = _client_id(op.get('client_id'))
+            if client_id is not None and client_id in seen:
+                raise ValueError("client_id is repeated within the batch.")
+            fields = _check_fields(model, build_fields(payload, user_id))
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        seen.add(client_id)
+        pending.append((index, client_id, kind, model, id_key, fields))
+    if errors:
+        return jsonify({'success': False, 'errors': errors}), 400
+
+    # A retried batch may repeat operations that were already saved
+    for attempt in range(2):
+        receipts = _receipts(user_id, [client_id for _, client_id, *_ in pending])
+        errors = [
+            {'index': index, 'error': 'client_id was already used for a different operation.'}
+            for index, client_id, _, model, _, _ in pending
+            if client_id in receipts and receipts[client_id].kind != model.__name__
+        ]
+        if errors:
+            return jsonify({'success': False, 'errors': errors}), 400
+
+        created = {}
+        try:
+            for index, client_id, _, model, _, fields in pending:
+                if client_id not in receipts:
+                    created[index] = model(**fields)
+            db.session.add_all(created.values())
+            db.session.flush()
+            db.session.add_all([
+                IdempotencyKey(user_id=user_id, key=client_id, kind=model.__name__, record_id=created[index].id)
+                for index, client_id, _, model, _, _ in pending if client_id and index in created
+            ])
+            db.session.commit()
+            break
+        except IntegrityError:
+            # a concurrent retry of the same operations committed first
+            db.session.rollback()
+            if attempt:
+                logger.exception("Error saving batch")
+                return jsonify({'success': False, 'error': 'Could not save right now. Please retry.'}), 500
+        except Exception:
+            db.session.rollback()
+            logger.exception("Error saving batch")
+            return jsonify({'success': False, 'error': 'Could not save right now. Please retry.'}), 500
+
+    if any(isinstance(record, Order) for record in created.values()):
+        order_history_cache.invalidate(user_id)
+    results = []
+    for index, client_id, kind, _, id_key, _ in pending:
+        if index in created:
+            results.append({'client_id': client_id, 'type': kind, id_key: created[index].id})
+        else:
+            results.append({'client_id': client_id, 'type': kind, id_key: receipts[client_id].record_id,
+                            'replayed': True})
+    return jsonify({'success': True, 'results': results}), 201
+
+
+# ----------------------------------------------------
+# 8️⃣ Debug Route (Optional)
 # ----------------------------------------------------
 @customer_bp.route('/debug-data', methods=['GET'])
 def debug_customer_data():
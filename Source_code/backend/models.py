@@ -42,3 +42,32 @@ class Event(db.Model):
     date = db.Column(db.String(20))
     message = db.Column(db.Text)
     created_at = db.Column(db.DateTime, default=datetime.now)
+
+class OrderStatusEvent(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False, index=True)
+    from_status = db.Column(db.String(20))
+    to_status = db.Column(db.String(20), nullable=False)
+    stage_seconds = db.Column(db.Float)  # time spent in from_status
+    created_at = db.Column(db.DateTime, default=datetime.now, index=True)
+
+class ArchiveRollup(db.Model):
+    """Daily aggregates of rows moved out of the hot tables by the archiver."""
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(20), nullable=False)  # 'orders' | 'rooms' | 'events'
+    day = db.Column(db.Date, nullable=False)
+    method = db.Column(db.String(20), default='')
+    status = db.Column(db.String(20), default='')
+    count = db.Column(db.Integer, default=0)
+    revenue = db.Column(db.Float, default=0.0)
+    __table_args__ = (db.UniqueConstraint('kind', 'day', 'method', 'status', name='uq_archive_rollup_key'),)
+
+class IdempotencyKey(db.Model):
+    """Client-chosen id of a submitted operation, so a retry returns the original row."""
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    kind = db.Column(db.String(20), nullable=False)  # model name of the created row
+    record_id = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.now)
+    __table_args__ = (db.UniqueConstraint('user_id', 'key', name='uq_idempotency_user_key'),)
@@ -0,0 +1,120 @@
+# backend/order_cache.py
+"""
+Per-user cache of the rendered "My Orders" page.
+
+Each entry holds the rendered HTML plus the version of the user's orders it
+was rendered from. The version doubles as the ETag. Every request runs one
+small aggregate probe (order count, newest id / ``created_at`` and newest
+status event — all status changes go through ``order_status.transition``,
+which records one) over ``ix_order_customer_created``; a cached page or a
+304 is only served when it matches, so changes made by another worker
+process are picked up on the next request. Explicit invalidation just frees
+memory early.
+
+On PostgreSQL, databases created before the index existed get it from
+``Scripts/create_indexes.py`` (``CREATE INDEX CONCURRENTLY``) rather than at
+start-up.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import func, inspect, select
+from sqlalchemy.schema import CreateIndex
+
+from models import db, Order, OrderStatusEvent
+
+logger = logging.getLogger(__name__)
+
+HISTORY_INDEX = db.Index('ix_order_customer_created', Order.customer_id, Order.created_at)
+
+
+class CachedPage:
+    __slots__ = ('html', 'etag', 'expires')
+
+    def __init__(self, html, etag, expires):
+        self.html = html
+        self.etag = etag
+        self.expires = expires
+
+
+def orders_version(user_id):
+    """Version tag for a user's orders; changes on any new, removed or re-statused order."""
+    last_event = (select(func.max(OrderStatusEvent.id))
+                  .join(Order, Order.id == OrderStatusEvent.order_id)
+                  .where(Order.customer_id == user_id)
+                  .scalar_subquery())
+    count, last_id, latest, event_id = db.session.execute(
+        select(func.count(Order.id), func.max(Order.id), func.max(Order.created_at), last_event)
+        .where(Order.customer_id == user_id)
+    ).one()
+    stamp = latest.strftime('%Y%m%d%H%M%S%f') if latest else '0'
+    return f"{count}-{last_id or 0}-{stamp}-{event_id or 0}"
+
+
+def ensure_history_index():
+    """Create the version-probe index on SQLite databases that predate it."""
+    if db.engine.dialect.name == 'sqlite':
+        with db.engine.begin() as conn:
+            conn.execute(CreateIndex(HISTORY_INDEX, if_not_exists=True))
+        return
+    existing = {index['name'] for index in inspect(db.engine).get_indexes(Order.__table__.name)}
+    if HISTORY_INDEX.name not in existing:
+        logger.warning("Index %s is missing; run Scripts/create_indexes.py", HISTORY_INDEX.name)
+
+
+class OrderHistoryCache:
+    """Small thread-safe LRU of rendered order-history pages keyed by user id."""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.ttl = 300
+        self.max_entries = 1000
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('ORDER_HISTORY_CACHE_ENABLED', True)
+        self.ttl = app.config.get('ORDER_HISTORY_CACHE_TTL', 300)
+        self.max_entries = app.config.get('ORDER_HISTORY_CACHE_SIZE', 1000)
+        app.extensions['order_history_cache'] = self
+
+    def get(self, user_id, version):
+        """Cached page for ``user_id`` if it was rendered from ``version``."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            page = self._entries.get(user_id)
+            if page is None:
+                return None
+            if page.etag != version or page.expires <= time.monotonic():
+                del self._entries[user_id]
+                return None
+            self._entries.move_to_end(user_id)
+            return page
+
+    def set(self, user_id, html, version):
+        page = CachedPage(html, version, time.monotonic() + self.ttl)
+        if not self.enabled:
+            return page
+        with self._lock:
+            self._entries[user_id] = page
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return page
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+order_history_cache = OrderHistoryCache()
@@ -0,0 +1,130 @@
+# backend/order_status.py
+"""
+Order lifecycle: Pending → Preparing → Ready → Delivered, with Cancelled
+reachable from any active state.
+
+Every transition is recorded as an ``OrderStatusEvent`` carrying the time the
+order spent in the stage it left, which is what the kitchen throughput
+metrics aggregate. Each active status has its own partial index on
+``created_at`` so the kitchen queue is read oldest-first straight from the
+index instead of scanning the whole order table.
+"""
+import logging
+import statistics
+from datetime import datetime
+
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateIndex
+
+from models import db, Order, OrderStatusEvent
+
+PENDING = 'Pending'
+PREPARING = 'Preparing'
+READY = 'Ready'
+DELIVERED = 'Delivered'
+CANCELLED = 'Cancelled'
+
+TRANSITIONS = {
+    PENDING: (PREPARING, CANCELLED),
+    PREPARING: (READY, CANCELLED),
+    READY: (DELIVERED, CANCELLED),
+    DELIVERED: (),
+    CANCELLED: (),
+}
+ACTIVE_STATUSES = (PENDING, PREPARING, READY)
+
+# Values written before the state machine existed.
+LEGACY_STATUSES = {'Completed': DELIVERED}
+
+logger = logging.getLogger(__name__)
+
+QUEUE_INDEXES = [
+    db.Index(f"ix_order_queue_{status.lower()}", Order.created_at,
+             sqlite_where=Order.status == status,
+             postgresql_where=Order.status == status)
+    for status in ACTIVE_STATUSES
+]
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def normalize(status):
+    """Map legacy / missing statuses onto the state machine."""
+    status = LEGACY_STATUSES.get(status, status)
+    return status if status in TRANSITIONS else PENDING
+
+
+def allowed_transitions(status):
+    return TRANSITIONS[normalize(status)]
+
+
+def transition(order, new_status, at=None):
+    """Move ``order`` to ``new_status`` and record the event (caller commits)."""
+    current = normalize(order.status)
+    if new_status not in TRANSITIONS[current]:
+        allowed = ', '.join(TRANSITIONS[current]) or 'none — this order is closed'
+        raise InvalidTransition(f"Cannot change order #{order.id} from {current} to {new_status}. "
+                                f"Allowed: {allowed}.")
+
+    at = at or datetime.now()
+    last = (OrderStatusEvent.query
+            .filter_by(order_id=order.id)
+            .order_by(OrderStatusEvent.created_at.desc())
+            .first())
+    entered = last.created_at if last else order.created_at
+    event = OrderStatusEvent(
+        order_id=order.id,
+        from_status=current,
+        to_status=new_status,
+        stage_seconds=(at - entered).total_seconds() if entered else None,
+        created_at=at,
+    )
+    order.status = new_status
+    db.session.add(event)
+    return event
+
+
+def ensure_queue_indexes():
+    """Create the per-status queue indexes on SQLite databases that predate them.
+
+    Elsewhere a plain CREATE INDEX would block writes to a large order table,
+    so they are built online by Scripts/create_indexes.py instead.
+    """
+    if db.engine.dialect.name == 'sqlite':
+        # IF NOT EXISTS rather than checkfirst: workers booting together race
+        with db.engine.begin() as conn:
+            for index in QUEUE_INDEXES:
+                conn.execute(CreateIndex(index, if_not_exists=True))
+        return
+    existing = {index['name'] for index in inspect(db.engine).get_indexes(Order.__table__.name)}
+    for index in QUEUE_INDEXES:
+        if index.name not in existing:
+            logger.warning("Index %s is missing; run Scripts/create_indexes.py", index.name)
+
+
+def stage_metrics(since):
+    """Per-stage timing (seconds) for transitions recorded since ``since``."""
+    durations = {}
+    rows = (db.session.query(OrderStatusEvent.from_status, OrderStatusEvent.stage_seconds)
+            .filter(OrderStatusEvent.created_at >= since,
+                    OrderStatusEvent.to_status != CANCELLED,
+                    OrderStatusEvent.stage_seconds.isnot(None)))
+    for stage, seconds in rows:
+        durations.setdefault(stage, []).append(seconds)
+
+    metrics = {}
+    for stage in ACTIVE_STATUSES:
+        values = sorted(durations.get(stage, []))
+        if not values:
+            metrics[stage] = {'completed': 0}
+            continue
+        metrics[stage] = {
+            'completed': len(values),
+            'avg_seconds': round(statistics.fmean(values), 1),
+            'p50_seconds': round(values[len(values) // 2], 1),
+            'p90_seconds': round(values[min(len(values) - 1, int(len(values) * 0.9))], 1),
+            'max_seconds': round(values[-1], 1),
+        }
+    return metrics
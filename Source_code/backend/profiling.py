@@ -0,0 +1,195 @@
+# backend/profiling.py
+"""
+Production request profiling.
+
+When PROFILING_ENABLED is set, a PROFILE_SAMPLE_RATE share of requests is
+profiled, and — if PROFILE_SLOW_MS is non-zero — every request that ends up
+slower than that threshold is kept as well. A single background thread
+samples the Python stack of each tracked request thread every
+PROFILE_INTERVAL_MS (a statistical profiler: no tracing hooks, so the
+request itself runs at full speed). Stacks are stored in folded
+``frame;frame;frame count`` form, ready for flamegraph.pl or speedscope,
+together with the SQL statements the request executed.
+
+Finished profiles go into a bounded ring buffer (PROFILE_BUFFER_SIZE),
+browsable at /admin/profiles.
+"""
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+MAX_STACK_DEPTH = 128
+
+
+def _fold(frame):
+    """Render a frame chain root-first as ``func (file:line);...``."""
+    parts = []
+    while frame is not None and len(parts) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        parts.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ';'.join(reversed(parts))
+
+
+class RequestProfile:
+    """Stack samples and SQL collected for one request."""
+
+    def __init__(self, profile_id, sampled):
+        self.id = profile_id
+        self.sampled = sampled
+        self.method = request.method
+        self.path = request.full_path.rstrip('?')
+        self.endpoint = request.endpoint
+        self.started_at = datetime.now()
+        self.thread_id = threading.get_ident()
+        self.start = time.perf_counter()
+        self.stacks = Counter()
+        self.sql = []
+        self.sql_ms = 0.0
+        self.status = None
+        self.duration_ms = None
+        self.reason = None
+
+    @property
+    def samples(self):
+        return sum(self.stacks.values())
+
+    def folded(self):
+        return '\n'.join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+
+class Profiler:
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.profiles = deque(maxlen=100)
+        self._active = {}
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._thread = None
+        self._wake = threading.Event()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['profiler'] = self
+        self.enabled = app.config.get('PROFILING_ENABLED', False)
+        if not self.enabled:
+            return
+
+        self.sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.01)
+        self.slow_ms = app.config.get('PROFILE_SLOW_MS', 500)
+        self.interval = app.config.get('PROFILE_INTERVAL_MS', 5) / 1000
+        self.max_sql = app.config.get('PROFILE_MAX_SQL', 200)
+        self.profiles = deque(maxlen=app.config.get('PROFILE_BUFFER_SIZE', 100))
+
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        app.teardown_request(self._discard)
+        event.listen(Engine, 'before_cursor_execute', self._before_sql)
+        event.listen(Engine, 'after_cursor_execute', self._after_sql)
+
+    def get(self, profile_id):
+        for profile in list(self.profiles):
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    # ----------------------------------------------------
+    # Request hooks
+    # ----------------------------------------------------
+    def _start(self):
+        sampled = random.random() < self.sample_rate
+        if not sampled and not self.slow_ms:
+            return
+        profile = RequestProfile(next(self._ids), sampled)
+        g._profile = profile
+        with self._lock:
+            self._active[profile.thread_id] = profile
+        self._ensure_sampler()
+        self._wake.set()
+
+    def _finish(self, response):
+        profile = g.pop('_profile', None)
+        if profile is None:
+            return response
+        with self._lock:
+            self._active.pop(profile.thread_id, None)
+
+        profile.duration_ms = round((time.perf_counter() - profile.start) * 1000, 2)
+        profile.status = response.status_code
+        if profile.sampled:
+            profile.reason = 'sampled'
+        elif profile.duration_ms >= self.slow_ms:
+            profile.reason = 'slow'
+        if profile.reason:
+            self.profiles.append(profile)
+        return response
+
+    def _discard(self, exc):
+        # after_request does not run when a view raises
+        profile = g.pop('_profile', None)
+        if profile is not None:
+            with self._lock:
+                self._active.pop(profile.thread_id, None)
+
+    # ----------------------------------------------------
+    # SQL capture
+    # ----------------------------------------------------
+    def _before_sql(self, conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._profile_sql_start = time.perf_counter()
+
+    def _after_sql(self, conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, '_profile_sql_start', None)
+        if started is None or not has_request_context():
+            return
+        profile = g.get('_profile')
+        if profile is None:
+            return
+        elapsed = (time.perf_counter() - started) * 1000
+        profile.sql_ms += elapsed
+        if len(profile.sql) < self.max_sql:
+            profile.sql.append({'statement': statement, 'ms': round(elapsed, 3), 'executemany': executemany})
+
+    # ----------------------------------------------------
+    # Sampler thread
+    # ----------------------------------------------------
+    def _ensure_sampler(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._sample_loop, name='request-profiler', daemon=True)
+            self._thread.start()
+
+    def _sample_loop(self):
+        while True:
+            with self._lock:
+                idle = not self._active
+                if idle:
+                    self._wake.clear()
+            if idle:
+                self._wake.wait()  # sleep until a tracked request starts
+                continue
+
+            time.sleep(self.interval)
+            with self._lock:
+                frames = sys._current_frames()
+                for thread_id, profile in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        profile.stacks[_fold(frame)] += 1
+
+
+profiler = Profiler()
@@ -0,0 +1,238 @@
+# backend/search.py
+"""
+Admin full-text search over customers, orders, private-room bookings and
+events.
+
+* SQLite: a single FTS5 table (``search_index``) kept current by triggers on
+  the source tables, so every insert/update/delete — including write-behind
+  batches and archival deletes — is reflected without application code.
+  The FTS rowid encodes the source row: ``id * 4 + kind code``. Set-up runs
+  under ``BEGIN IMMEDIATE`` and the backfill skips rows already indexed, so
+  workers starting together cannot trip over each other.
+* PostgreSQL: GIN indexes on ``to_tsvector('simple', ...)`` expressions of
+  each source table; queries use the same expressions so the planner can
+  use them, and rank with ``ts_rank``. The indexes are built by
+  ``Scripts/create_indexes.py`` (``CREATE INDEX CONCURRENTLY``), never at
+  start-up.
+* Anything else falls back to unranked ``LIKE`` matching — as does a worker
+  whose set-up failed, until a retry SETUP_RETRY_SECONDS later succeeds.
+
+Queries are split into word tokens and prefix-matched, all tokens required.
+"""
+import logging
+import re
+import time
+
+from sqlalchemy import inspect, or_, text
+
+from models import db, User, Order, PrivateRoom, Event
+
+logger = logging.getLogger(__name__)
+
+# kind -> (model, fts rowid code, searchable columns)
+SEARCH_SOURCES = {
+    'user': (User, 0, ('name', 'email')),
+    'order': (Order, 1, ('address', 'special_requests')),
+    'room': (PrivateRoom, 2, ('message',)),
+    'event': (Event, 3, ('event_type', 'message')),
+}
+KIND_CODES = 4
+FTS_TABLE = 'search_index'
+SETUP_RETRY_SECONDS = 60
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def _tokens(query):
+    return _TOKEN_RE.findall(query or '')[:16]
+
+
+def _document(columns, prefix=''):
+    """SQL expression concatenating the searchable columns of a row."""
+    return " || ' ' || ".join(f"coalesce({prefix}{column}, '')" for column in columns)
+
+
+def _gin_index_name(model):
+    return f"ix_{model.__table__.name}_search"
+
+
+def postgres_index_statements():
+    """(name, table, statement) for each GIN index, built without blocking writes."""
+    return [
+        (_gin_index_name(model), model.__table__.name,
+         f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {_gin_index_name(model)} ON "{model.__table__.name}" '
+         f"USING gin (to_tsvector('simple', {_document(columns)}))")
+        for model, _code, columns in SEARCH_SOURCES.values()
+    ]
+
+
+class SearchIndex:
+
+    def __init__(self, app=None):
+        self.dialect = None
+        self.ready = False
+        self._retry_at = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['search_index'] = self
+        with app.app_context():
+            self.dialect = db.engine.dialect.name
+            self._setup()
+
+    def _setup(self):
+        try:
+            self.ensure_schema()
+            self.ready = True
+        except Exception:
+            # e.g. a lock held too long by another worker, or an SQLite build
+            # without FTS5 — use LIKE for now and try again later
+            db.session.rollback()
+            self.ready = False
+            self._retry_at = time.monotonic() + SETUP_RETRY_SECONDS
+            logger.exception("Full-text search setup failed; using LIKE matching until a retry succeeds")
+
+    def _table(self, model):
+        return db.engine.dialect.identifier_preparer.quote(model.__table__.name)
+
+    # ----------------------------------------------------
+    # Schema
+    # ----------------------------------------------------
+    def ensure_schema(self):
+        if self.dialect == 'sqlite':
+            # BEGIN IMMEDIATE takes the write lock before anything is read, so
+            # concurrent workers run this one after another, never interleaved
+            with db.engine.connect() as conn:
+                conn.exec_driver_sql("BEGIN IMMEDIATE")
+                try:
+                    self._ensure_sqlite(conn)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+        elif self.dialect == 'postgresql':
+            self._check_postgres()
+
+    def _ensure_sqlite(self, conn):
+        conn.execute(text(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            f"USING fts5(body, kind UNINDEXED, tokenize = 'unicode61')"
+        ))
+        triggers = {name for (name,) in conn.execute(text("SELECT name FROM sqlite_master WHERE type = 'trigger'"))}
+
+        for kind, (model, code, columns) in SEARCH_SOURCES.items():
+            table = self._table(model)
+            rowid = f"{{row}}.id * {KIND_CODES} + {code}"
+            insert_row = (f"INSERT INTO {FTS_TABLE} (rowid, body, kind) "
+                          f"VALUES ({rowid.format(row='new')}, {_document(columns, 'new.')}, '{kind}');")
+            delete_row = f"DELETE FROM {FTS_TABLE} WHERE rowid = {rowid.format(row='old')};"
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_{kind}_ai AFTER INSERT ON {table} "
+                f"BEGIN {insert_row} END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_{kind}_ad AFTER DELETE ON {table} "
+                f"BEGIN {delete_row} END"
+            ))
+            conn.execute(text(
+                f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_{kind}_au AFTER UPDATE ON {table} "
+                f"BEGIN {delete_row} {insert_row} END"
+            ))
+
+            # Backfill once, when the triggers are first installed; skipping
+            # rows already indexed keeps a repeated run harmless
+            if f"{FTS_TABLE}_{kind}_ai" not in triggers:
+                conn.execute(text(
+                    f"INSERT INTO {FTS_TABLE} (rowid, body, kind) "
+                    f"SELECT id * {KIND_CODES} + {code}, {_document(columns)}, '{kind}' FROM {table} "
+                    f"WHERE id * {KIND_CODES} + {code} NOT IN (SELECT rowid FROM {FTS_TABLE})"
+                ))
+
+    def _check_postgres(self):
+        inspector = inspect(db.engine)
+        for name, table, _statement in postgres_index_statements():
+            if name not in {index['name'] for index in inspector.get_indexes(table)}:
+                logger.warning("Search index %s is missing; run Scripts/create_indexes.py", name)
+
+    # ----------------------------------------------------
+    # Querying
+    # ----------------------------------------------------
+    def search(self, query, page=1, per_page=20, kind=None):
+        """Return ``(hits, total)``; hits are ranked ``(kind, id)`` pairs."""
+        tokens = _tokens(query)
+        if not tokens:
+            return [], 0
+        kinds = [kind] if kind in SEARCH_SOURCES else list(SEARCH_SOURCES)
+        offset = (max(page, 1) - 1) * per_page
+
+        if not self.ready and self.dialect in ('sqlite', 'postgresql') and time.monotonic() >= self._retry_at:
+            self._setup()
+        if self.ready and self.dialect == 'sqlite':
+            return self._search_sqlite(tokens, kinds, per_page, offset)
+        if self.ready and self.dialect == 'postgresql':
+            return self._search_postgres(tokens, kinds, per_page, offset)
+        return self._search_like(tokens, kinds, per_page, offset)
+
+    def _search_sqlite(self, tokens, kinds, limit, offset):
+        params = {'match': ' '.join(f'"{token}"*' for token in tokens), 'limit': limit, 'offset': offset}
+        kind_filter = ''
+        if len(kinds) == 1:
+            kind_filter = 'AND kind = :kind'
+            params['kind'] = kinds[0]
+
+        rows = db.session.execute(text(
+            f"SELECT rowid, kind FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match {kind_filter} "
+            f"ORDER BY bm25({FTS_TABLE}) LIMIT :limit OFFSET :offset"
+        ), params).all()
+        total = db.session.execute(text(
+            f"SELECT count(*) FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match {kind_filter}"
+        ), params).scalar()
+        return [(kind, rowid // KIND_CODES) for rowid, kind in rows], total
+
+    def _search_postgres(self, tokens, kinds, limit, offset):
+        selects = []
+        for kind in kinds:
+            model, _code, columns = SEARCH_SOURCES[kind]
+            vector = f"to_tsvector('simple', {_document(columns)})"
+            selects.append(
+                f"SELECT '{kind}' AS kind, id, ts_rank({vector}, q) AS rank "
+                f"FROM {self._table(model)}, to_tsquery('simple', :query) q WHERE {vector} @@ q"
+            )
+        union = ' UNION ALL '.join(selects)
+        params = {'query': ' & '.join(f"{token}:*" for token in tokens), 'limit': limit, 'offset': offset}
+
+        rows = db.session.execute(text(
+            f"SELECT kind, id FROM ({union}) hits ORDER BY rank DESC, id DESC LIMIT :limit OFFSET :offset"
+        ), params).all()
+        total = db.session.execute(text(f"SELECT count(*) FROM ({union}) hits"), params).scalar()
+        return [(kind, id_) for kind, id_ in rows], total
+
+    def _search_like(self, tokens, kinds, limit, offset):
+        hits = []
+        for kind in kinds:
+            model, _code, columns = SEARCH_SOURCES[kind]
+            conditions = [
+                or_(*(getattr(model, column).ilike(f"%{token}%") for column in columns))
+                for token in tokens
+            ]
+            hits.extend((kind, id_) for (id_,) in db.session.query(model.id).filter(*conditions))
+        return hits[offset:offset + limit], len(hits)
+
+    # ----------------------------------------------------
+    # Results
+    # ----------------------------------------------------
+    def load(self, hits):
+        """Fetch the rows behind ``hits``, preserving rank order."""
+        wanted = {}
+        for kind, id_ in hits:
+            wanted.setdefault(kind, []).append(id_)
+        rows = {}
+        for kind, ids in wanted.items():
+            model = SEARCH_SOURCES[kind][0]
+            for obj in model.query.filter(model.id.in_(ids)):
+                rows[(kind, obj.id)] = obj
+        return [(kind, rows[(kind, id_)]) for kind, id_ in hits if (kind, id_) in rows]
+
+
+search_index = SearchIndex()
@@ -0,0 +1,235 @@
+# backend/structured_logging.py
+"""
+Structured, non-blocking application logging.
+
+``request_logging.init_app(app)`` routes every ``logging`` record through a
+``QueueHandler``: the request thread only appends the record to an in-memory
+queue, and a single ``QueueListener`` thread does the redaction, JSON
+formatting and the actual write to stdout. When the queue is full (stdout
+stalled) records are dropped and counted rather than blocking the request.
+
+Each request gets a correlation id — the incoming REQUEST_ID_HEADER if it
+looks sane, otherwise a fresh one — which is attached to every record logged
+while handling it and echoed back in the response header.
+
+Requests under LOG_SAMPLE_PATHS (static files, polling endpoints) keep only a
+LOG_SAMPLE_RATE share of their INFO/DEBUG records; the decision is made once
+per request so a kept request is logged completely. Warnings and errors are
+always kept.
+
+OTPs, passwords, API keys, secrets, tokens and credentials embedded in URLs
+are redacted from both the message and any ``extra`` fields; so is any 4-8
+digit number written next to the word "OTP" or "code" in free text.
+"""
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import random
+import re
+import sys
+import time
+import uuid
+from datetime import datetime, timezone
+
+from flask import g, has_request_context, request
+
+access_logger = logging.getLogger('access')
+
+REDACTED = '[REDACTED]'
+SENSITIVE_KEYS = re.compile(r'otp|pass(word|wd)?|api[-_]?key|secret|token|authorization', re.I)
+SENSITIVE_PAIRS = re.compile(
+    r'\b(otp|pass(?:word|wd)?|api[-_]?key|secret|token|authorization)(["\']?\s*[:=]\s*["\']?)([^\s,;&"\']+)',
+    re.I,
+)
+URL_CREDENTIALS = re.compile(r'(://[^:/@\s]+:)[^@/\s]+@')
+# "Your OTP is 123456", "Fallback OTP for a@b.com: 123456", "123456 is your code"
+OTP_NEARBY = re.compile(
+    r'\b((?:pass)?code|otp)\b([^\n]{0,40}?)(?<!\w)\d{4,8}(?!\w)'
+    r'|(?<!\w)\d{4,8}(?!\w)(?=[^\d\n]{0,20}\b(?:otp|code)\b)',
+    re.I,
+)
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,128}')
+
+# Attributes every LogRecord has; anything else came in through ``extra=``
+_RECORD_ATTRS = set(vars(logging.makeLogRecord({}))) | {'message', 'asctime', 'taskName'}
+_CONTEXT_ATTRS = ('request_id', 'method', 'path')
+
+
+def redact(text):
+    text = SENSITIVE_PAIRS.sub(lambda m: f"{m.group(1)}{m.group(2)}{REDACTED}", text)
+    text = OTP_NEARBY.sub(lambda m: f"{m.group(1)}{m.group(2)}{REDACTED}" if m.group(1) else REDACTED, text)
+    return URL_CREDENTIALS.sub(rf'\1{REDACTED}@', text)
+
+
+def _extras(record):
+    return {key: value for key, value in vars(record).items()
+            if key not in _RECORD_ATTRS and key not in _CONTEXT_ATTRS}
+
+
+# ----------------------------------------------------
+# Filters
+# ----------------------------------------------------
+class RequestContextFilter(logging.Filter):
+    """Stamp records with the current request's correlation id (caller thread)."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id')
+            record.method = request.method
+            record.path = request.path
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Drop the low-severity records of requests not chosen for logging."""
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or not has_request_context():
+            return True
+        return g.get('log_sampled', True)
+
+
+class RedactionFilter(logging.Filter):
+    """Mask secrets in the message and ``extra`` fields (listener thread)."""
+
+    def filter(self, record):
+        record.msg = redact(record.getMessage())
+        record.args = None
+        for key, value in _extras(record).items():
+            if SENSITIVE_KEYS.search(key):
+                setattr(record, key, REDACTED)
+            elif isinstance(value, str):
+                setattr(record, key, redact(value))
+        if record.exc_text:
+            record.exc_text = redact(record.exc_text)
+        return True
+
+
+# ----------------------------------------------------
+# Formatter / handler
+# ----------------------------------------------------
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line."""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key in _CONTEXT_ATTRS:
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        entry.update(_extras(record))
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: a full queue drops the record."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Only merge the args here; full formatting happens on the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+# ----------------------------------------------------
+# Extension
+# ----------------------------------------------------
+class RequestLogging:
+
+    def __init__(self, app=None):
+        self.handler = None
+        self.listener = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['request_logging'] = self
+        self.header = app.config.get('REQUEST_ID_HEADER', 'X-Request-ID')
+        self.sample_paths = tuple(app.config.get('LOG_SAMPLE_PATHS', ()))
+        self.sample_rate = app.config.get('LOG_SAMPLE_RATE', 0.1)
+        self.access_log = app.config.get('LOG_ACCESS', True)
+
+        self._configure(app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+
+    def _configure(self, app):
+        root = logging.getLogger()
+        root.setLevel(app.config.get('LOG_LEVEL', 'INFO'))
+        if self.listener is not None:
+            return
+
+        output = logging.StreamHandler(sys.stdout)
+        output.addFilter(RedactionFilter())
+        if app.config.get('LOG_FORMAT', 'json') == 'json':
+            output.setFormatter(JsonFormatter())
+        else:
+            output.setFormatter(logging.Formatter(
+                '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s', defaults={'request_id': '-'}))
+
+        self.handler = DroppingQueueHandler(queue.Queue(app.config.get('LOG_QUEUE_SIZE', 10000)))
+        self.handler.addFilter(SamplingFilter())
+        self.handler.addFilter(RequestContextFilter())
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(self.handler)
+
+        self.listener = logging.handlers.QueueListener(self.handler.queue, output, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.shutdown)
+
+    def shutdown(self):
+        """Flush queued records and stop the writer thread."""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
+    # ----------------------------------------------------
+    # Request hooks
+    # ----------------------------------------------------
+    def _start(self):
+        incoming = request.headers.get(self.header, '')
+        g.request_id = incoming if REQUEST_ID_PATTERN.fullmatch(incoming) else uuid.uuid4().hex
+        g.log_sampled = (not request.path.startswith(self.sample_paths)
+                         or random.random() < self.sample_rate)
+        g.log_start = time.perf_counter()
+
+    def _finish(self, response):
+        request_id = g.get('request_id')
+        if request_id:
+            response.headers[self.header] = request_id
+        if self.access_log and 'log_start' in g:
+            access_logger.info("%s %s %s", request.method, request.path, response.status_code, extra={
+                'status': response.status_code,
+                'duration_ms': round((time.perf_counter() - g.log_start) * 1000, 2),
+            })
+        return response
+
+
+request_logging = RequestLogging()
@@ -0,0 +1,410 @@
+# backend/write_behind.py
+"""
+Opt-in write-behind buffer for order / booking / reservation inserts.
+
+Instead of one INSERT + COMMIT per request, accepted rows are appended to a
+local append-only spool file (so they survive a crash), kept in memory and
+inserted in a single executemany transaction when either
+WRITE_BEHIND_BATCH_SIZE rows are pending or WRITE_BEHIND_FLUSH_INTERVAL
+seconds have passed. Callers get a provisional id back immediately. Rows
+submitted with an idempotency key are inserted in the same transaction with
+RETURNING so each new id lands in its ``IdempotencyKey`` receipt; resubmitting
+a key that is still pending returns the pending row's provisional id.
+
+Spool segments are named ``<pid>-<seq>.ndjson`` and are deleted once the rows
+they hold are committed. Segments left behind by a dead process are replayed
+on the next start-up.
+
+If a batch INSERT is rejected for its data (constraint / type errors), the
+rows are retried one by one and any row that still fails is moved to
+``dead-letter.jsonl`` in the spool directory, so one bad row can never hold
+up the rows queued behind it. Connection-level failures requeue the batch.
+"""
+import atexit
+import json
+import logging
+import os
+import threading
+import uuid
+from datetime import datetime
+
+from sqlalchemy import DateTime, insert
+from sqlalchemy.exc import DataError, DBAPIError, IntegrityError, StatementError
+
+from models import db, Order, PrivateRoom, Event, IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Only these models may be buffered; the spool stores them by class name.
+BUFFERED_MODELS = {model.__name__: model for model in (Order, PrivateRoom, Event)}
+
+DEAD_LETTER_FILE = 'dead-letter.jsonl'
+
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot spool value of type {type(value).__name__}")
+
+
+def _decode_row(model, row):
+    """Turn a spooled JSON row back into column values for ``model``."""
+    for column in model.__table__.columns:
+        if isinstance(column.type, DateTime) and isinstance(row.get(column.name), str):
+            row[column.name] = datetime.fromisoformat(row[column.name])
+    return row
+
+
+def _is_row_error(exc):
+    """True when the INSERT failed because of the data, not the connection."""
+    if isinstance(exc, (IntegrityError, DataError)):
+        return True
+    # raised while binding parameters, before the statement reached the DB
+    return isinstance(exc, StatementError) and not isinstance(exc, DBAPIError)
+
+
+def _pid_alive(pid):
+    # Windows has no signal-0 probe (os.kill would terminate the process) and
+    # only ever runs the single-process dev server, so treat peers as gone.
+    if os.name == 'nt':
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class WriteBehindBuffer:
+    """In-process insert buffer with a crash-safe spool file."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.enabled = False
+        self._lock = threading.Lock()        # guards pending rows + spool file
+        self._flush_lock = threading.Lock()  # only one flush runs at a time
+        self._pending = []
+        self._sealed = []                    # closed segments not yet committed
+        self._spool = None
+        self._spool_path = None
+        self._segment = 0
+        self._pid = os.getpid()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._flush_listeners = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.enabled = app.config.get('WRITE_BEHIND_ENABLED', False)
+        app.extensions['write_behind'] = self
+        if not self.enabled:
+            return
+
+        self.batch_size = max(1, app.config.get('WRITE_BEHIND_BATCH_SIZE', 200))
+        self.interval = app.config.get('WRITE_BEHIND_FLUSH_INTERVAL', 1.0)
+        self.fsync = app.config.get('WRITE_BEHIND_FSYNC', False)
+        self.spool_dir = os.path.abspath(app.config.get('WRITE_BEHIND_SPOOL_DIR', 'write_behind_spool'))
+        os.makedirs(self.spool_dir, exist_ok=True)
+
+        with app.app_context():
+            self.recover()
+        atexit.register(self.shutdown)
+
+    # ----------------------------------------------------
+    # Accepting rows
+    # ----------------------------------------------------
+    def submit(self, model, fields, idempotency_key=None):
+        """Spool one row for ``model`` and return its provisional id."""
+        if model.__name__ not in BUFFERED_MODELS:
+            raise ValueError(f"{model.__name__} is not a write-behind model")
+
+        row = dict(fields)
+        row.setdefault('created_at', datetime.now())
+        record = {
+            'model': model.__name__,
+            'provisional_id': f"tmp-{uuid.uuid4().hex}",
+            'row': row,
+        }
+        if idempotency_key is not None:
+            record['receipt'] = {'user_id': row['customer_id'], 'key': idempotency_key}
+        line = json.dumps(record, default=_encode) + "\n"
+
+        with self._lock:
+            if 'receipt' in record:
+                for pending in self._pending:
+                    if pending.get('receipt') == record['receipt']:
+                        return pending['provisional_id']
+            spool = self._open_spool()
+            spool.write(line)
+            spool.flush()
+            if self.fsync:
+                os.fsync(spool.fileno())
+            self._pending.append(record)
+            full = len(self._pending) >= self.batch_size
+
+        self._ensure_flusher()
+        if full:
+            self._wake.set()
+        return record['provisional_id']
+
+    def add_flush_listener(self, callback):
+        """Call ``callback(records)`` after each batch is committed."""
+        self._flush_listeners.append(callback)
+
+    def pending_count(self):
+        with self._lock:
+            return len(self._pending)
+
+    # ----------------------------------------------------
+    # Flushing
+    # ----------------------------------------------------
+    def flush(self):
+        """Insert everything pending in one transaction. Returns rows written."""
+        with self._flush_lock:
+            with self._lock:
+                if not self._pending:
+                    return 0
+                batch, self._pending = self._pending, []
+                self._seal_spool()
+                segments, self._sealed = self._sealed, []
+
+            try:
+                with self.app.app_context():
+                    written, remaining = self._commit(batch)
+            except Exception:
+                logger.exception("Write-behind flush of %d rows failed; will retry", len(batch))
+                with self._lock:
+                    self._pending[:0] = batch
+                    self._sealed[:0] = segments
+                return 0
+
+            if remaining:
+                # Part of the batch landed: respool only what is left so a
+                # later replay cannot insert the committed rows twice.
+                with self._lock:
+                    self._pending[:0] = remaining
+                    self._sealed[:0] = [self._write_segment(remaining)]
+            for path in segments:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            self._notify(written)
+            return len(written)
+
+    def _commit(self, records):
+        """Insert ``records``, isolating rows the database rejects.
+
+        Returns ``(written, remaining)``: ``remaining`` is non-empty only when
+        a row-by-row retry hit a connection-level error part way through.
+        """
+        try:
+            self._insert(records)
+            return records, []
+        except Exception as exc:
+            if not _is_row_error(exc):
+                raise
+            logger.warning("Write-behind batch of %d rows rejected; retrying row by row", len(records))
+
+        written = []
+        for index, record in enumerate(records):
+            try:
+                self._insert([record])
+            except Exception as exc:
+                if _is_row_error(exc) and self._already_saved(record):
+                    logger.info("Write-behind row %s repeats a saved operation; dropped", record['provisional_id'])
+                    continue
+                if _is_row_error(exc) and self._dead_letter(record, exc):
+                    continue
+                logger.exception("Write-behind row retry failed; requeueing %d rows", len(records) - index)
+                return written, records[index:]
+            written.append(record)
+        return written, []
+
+    def _already_saved(self, record):
+        """True if ``record`` carries an idempotency key that already has a receipt."""
+        receipt = record.get('receipt')
+        return receipt is not None and IdempotencyKey.query.filter_by(**receipt).first() is not None
+
+    def _dead_letter(self, record, exc):
+        """Park a row the database will never accept. Returns False if it could not be saved."""
+        entry = dict(record, error=str(getattr(exc, 'orig', None) or exc), failed_at=datetime.now())
+        try:
+            with open(os.path.join(self.spool_dir, DEAD_LETTER_FILE), 'a', encoding='utf-8') as fh:
+                fh.write(json.dumps(entry, default=_encode) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+        except OSError:
+            logger.exception("Could not write write-behind dead letter")
+            return False
+        logger.error("Write-behind row %s rejected by the database; moved to %s",
+                     record['provisional_id'], DEAD_LETTER_FILE, extra={'error': entry['error']})
+        return True
+
+    def _insert(self, records):
+        grouped, keyed = {}, {}
+        for record in records:
+            target = keyed if record.get('receipt') else grouped
+            target.setdefault(record['model'], []).append(record)
+        try:
+            for name, group in grouped.items():
+                db.session.execute(insert(BUFFERED_MODELS[name]), [record['row'] for record in group])
+            receipts = []
+            for name, group in keyed.items():
+                now = datetime.now()
+                receipts.extend(dict(record['receipt'], kind=name, record_id=record_id, created_at=now)
+                                for record, record_id in zip(group, self._insert_returning_ids(name, group)))
+            if receipts:
+                db.session.execute(insert(IdempotencyKey), receipts)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def _insert_returning_ids(name, group):
+        """Insert ``group``'s rows as one batch and return their new ids in order."""
+        table = BUFFERED_MODELS[name].__table__
+        rows = [record['row'] for record in group]
+        # (customer_id, created_at) identifies a keyed row, which lets the ids be
+        # matched up without asking for RETURNING in parameter order — SQLite
+        # can only honour that one row per statement
+        position = {(row['customer_id'], row['created_at']): i for i, row in enumerate(rows)}
+        if len(position) < len(rows):
+            return db.session.execute(
+                insert(table).returning(table.c.id, sort_by_parameter_order=True), rows,
+            ).scalars().all()
+        ids = [None] * len(rows)
+        returned = db.session.execute(
+            insert(table).returning(table.c.id, table.c.customer_id, table.c.created_at), rows)
+        for record_id, customer_id, created_at in returned:
+            ids[position[(customer_id, created_at)]] = record_id
+        return ids
+
+    def _notify(self, records):
+        for callback in self._flush_listeners:
+            try:
+                callback(records)
+            except Exception:
+                logger.exception("Write-behind flush listener failed")
+
+    def shutdown(self):
+        """Stop the flusher thread and write out whatever is still pending."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=self.interval + 5)
+        self.flush()
+        with self._lock:
+            if self._spool is not None:
+                self._spool.close()
+                self._spool = None
+
+    def _ensure_flusher(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='write-behind-flusher', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+    # ----------------------------------------------------
+    # Spool segments
+    # ----------------------------------------------------
+    def _open_spool(self):
+        if self._pid != os.getpid():
+            # Forked worker: the parent's buffer state is not ours to flush.
+            self._pid = os.getpid()
+            self._pending, self._sealed = [], []
+            self._spool, self._thread = None, None
+        if self._spool is None:
+            self._segment += 1
+            self._spool_path = os.path.join(self.spool_dir, f"{self._pid}-{self._segment:06d}.ndjson")
+            self._spool = open(self._spool_path, 'a', encoding='utf-8')
+        return self._spool
+
+    def _write_segment(self, records):
+        """Write ``records`` to a new, already sealed segment. Caller holds ``_lock``."""
+        self._segment += 1
+        path = os.path.join(self.spool_dir, f"{self._pid}-{self._segment:06d}.ndjson")
+        with open(path, 'w', encoding='utf-8') as spool:
+            for record in records:
+                spool.write(json.dumps(record, default=_encode) + "\n")
+            spool.flush()
+            os.fsync(spool.fileno())
+        return path
+
+    def _seal_spool(self):
+        if self._spool is not None:
+            self._spool.close()
+            self._sealed.append(self._spool_path)
+            self._spool = None
+            self._spool_path = None
+
+    def recover(self):
+        """Replay spool segments left behind by processes that are no longer running."""
+        recovered = 0
+        for name in sorted(os.listdir(self.spool_dir)):
+            if not name.endswith('.ndjson'):
+                continue
+            try:
+                owner = int(name.split('-', 1)[0])
+            except ValueError:
+                continue
+            if owner != os.getpid() and _pid_alive(owner):
+                continue
+
+            path = os.path.join(self.spool_dir, name)
+            claimed = f"{path}.recovering-{os.getpid()}"
+            try:
+                os.rename(path, claimed)
+            except OSError:
+                continue  # another worker got there first
+
+            records = []
+            with open(claimed, encoding='utf-8') as spool:
+                for line in spool:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        continue  # torn final line from a crash mid-write
+                    model = BUFFERED_MODELS.get(record.get('model'))
+                    if model is not None:
+                        record['row'] = _decode_row(model, record['row'])
+                        records.append(record)
+
+            try:
+                written, remaining = self._commit(records) if records else ([], [])
+            except Exception:
+                logger.exception("Could not replay write-behind spool %s", name)
+                os.rename(claimed, path)
+                continue
+            if remaining:
+                with open(claimed, 'w', encoding='utf-8') as spool:
+                    for record in remaining:
+                        spool.write(json.dumps(record, default=_encode) + "\n")
+                os.rename(claimed, path)
+            else:
+                os.remove(claimed)
+            self._notify(written)
+            recovered += len(written)
+
+        if recovered:
+            logger.info("Replayed %d spooled rows from a previous run", recovered)
+        return recovered
+
+
+write_behind = WriteBehindBuffer()
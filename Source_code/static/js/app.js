@@ -202,6 +202,101 @@ document.getElementById('clearCart')?.addEventListener('click', ()=>{
   document.querySelectorAll('.dish-qty').forEach(q=>q.value=1);
 });
 
+/* =====================================================
+ 📡 OFFLINE QUEUE + BATCH SUBMISSION
+    Orders / bookings made while offline are kept in
+    localStorage and sent together to /customer/api/batch
+    as soon as the connection comes back. The queue is
+    kept per signed-in user, so nothing queued by one
+    account is ever sent under another account's session.
+ ===================================================== */
+const OfflineQueue = (function(){
+  const PREFIX = 'pendingOperations:';
+  let batchSize = 20;           // lowered to the server's limit if it reports one
+  let flushing = false;
+
+  // queues written before they were kept per user have no known owner
+  localStorage.removeItem('pendingOperations');
+
+  const owner = () => document.body?.dataset.user || '';
+  const key = () => PREFIX + owner();
+  const load = () => {
+    if (!owner()) return [];
+    try { return JSON.parse(localStorage.getItem(key())) || []; }
+    catch(e){ return []; }
+  };
+  const save = ops => {
+    if (ops.length) localStorage.setItem(key(), JSON.stringify(ops));
+    else localStorage.removeItem(key());
+  };
+  const newId = () => `${Date.now()}-${Math.random().toString(36).slice(2,10)}`;
+
+  // ``clientId`` is the id the operation was first sent with, so the server
+  // can recognise a replay of a request that did land before the network died.
+  // Returns false when nobody is signed in (nothing to attach the operation to).
+  function enqueue(type, payload, clientId){
+    if (!owner()) return false;
+    const ops = load();
+    ops.push({ client_id: clientId || newId(), type, payload });
+    save(ops);
+    return true;
+  }
+
+  async function flush(){
+    if (flushing || !navigator.onLine || !owner()) return;
+    flushing = true;
+    let sent = 0;
+    try{
+      let ops = load();
+      while (ops.length){
+        const batch = ops.slice(0, batchSize);
+        const res = await fetch('/customer/api/batch',{
+          method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify({ operations: batch })
+        });
+        const data = await res.json().catch(()=>({}));
+
+        let done = [], resend = false;
+        if (res.ok){
+          done = batch;
+          sent += batch.length;
+        } else if (data.max_operations && data.max_operations < batch.length){
+          batchSize = data.max_operations;   // resend in smaller batches
+          resend = true;
+        } else if (res.status === 400 && Array.isArray(data.errors) && data.errors.length){
+          // drop only the rejected operations; the rest go out on the next round
+          done = data.errors.map(e=>batch[e.index]).filter(Boolean);
+          console.warn('Dropped invalid queued operations:', data.errors);
+        }
+        // anything else (login needed, 5xx, 408/429, a proxy error page) keeps the queue for later
+        if (!done.length && !resend) break;
+
+        const doneIds = new Set(done.map(op=>op.client_id));
+        ops = load().filter(op=>!doneIds.has(op.client_id));
+        save(ops);
+      }
+    }catch(err){
+      console.warn('Offline queue flush failed; will retry when back online.', err);
+    }finally{
+      flushing = false;
+    }
+    if (sent) alert(`✅ ${sent} saved request(s) sent now that you're back online.`);
+  }
+
+  window.addEventListener('online', flush);
+  window.addEventListener('load', flush);
+
+  return { enqueue, flush, newId, size: ()=>load().length };
+})();
+
+/* Queue ``payload`` when offline; returns true if it was queued. */
+function queueIfOffline(type, payload, err){
+  // fetch() rejects with a TypeError only when the request never reached the server
+  if (navigator.onLine && !(err instanceof TypeError)) return false;
+  if (!OfflineQueue.enqueue(type, payload, payload.client_id)) return false;
+  alert("📡 You're offline — we've saved this and will send it when you're back online.");
+  return true;
+}
+
 /* =====================================================
  🧾 Submit Order (AJAX + login handling)
  ===================================================== */
@@ -221,9 +316,12 @@ document.getElementById('reservationForm')?.addEventListener('submit', async (e)
       specialRequests: document.getElementById('specialRequests')?.value || ''
     },
     items: orderItems,
-    total: orderItems.reduce((s,i)=>s+i.price*i.quantity,0)
+    total: orderItems.reduce((s,i)=>s+i.price*i.quantity,0),
+    client_id: OfflineQueue.newId()   // lets the server dedupe a retried submit
   };
 
+  if (queueIfOffline('order', payload)) return resetAll();
+
   try{
     const res = await fetch('/customer/api/orders',{
       method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify(payload)
@@ -245,6 +343,7 @@ document.getElementById('reservationForm')?.addEventListener('submit', async (e)
     }
   }catch(err){
     console.error(err);
+    if (queueIfOffline('order', payload, err)) return resetAll();
     alert('⚠️ Network error. Please try again.');
   }
 });
@@ -278,7 +377,11 @@ function resetAll(){
       date: form.querySelector('input[type="date"]').value.trim(),
       time: form.querySelector('input[type="time"]').value.trim(),
       message: form.querySelector('textarea').value.trim(),
+      client_id: OfflineQueue.newId()
     };
+    if (queueIfOffline('private_room', formData)){
+      form.reset(); wrap.classList.add('hidden'); return;
+    }
     try{
       const res = await fetch('/customer/api/private-room',{
         method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify(formData)
@@ -296,7 +399,9 @@ function resetAll(){
         form.reset(); wrap.classList.add('hidden');
       } else alert('⚠️ '+(result.error||'Something went wrong.'));
     }catch(err){
-      console.error(err); alert('⚠️ Network error.');
+      console.error(err);
+      if (queueIfOffline('private_room', formData, err)){ form.reset(); wrap.classList.add('hidden'); return; }
+      alert('⚠️ Network error.');
     }
   });
 })();
@@ -322,8 +427,12 @@ function resetAll(){
       event_type: form.querySelector('input[placeholder="Event Type (Wedding, Party, etc.)"]').value.trim(),
       guests: form.querySelector('input[placeholder="Number of Guests"]').value.trim(),
       date: form.querySelector('input[type="date"]').value.trim(),
-      message: form.querySelector('textarea').value.trim()
+      message: form.querySelector('textarea').value.trim(),
+      client_id: OfflineQueue.newId()
     };
+    if (queueIfOffline('event', formData)){
+      form.reset(); wrap.classList.add('hidden'); return;
+    }
     try{
       const res = await fetch('/customer/api/event-reservation',{
         method:'POST', headers:{'Content-Type':'application/json'}, body:JSON.stringify(formData)
@@ -341,7 +450,9 @@ function resetAll(){
         form.reset(); wrap.classList.add('hidden');
       } else alert('⚠️ '+(result.error||'Something went wrong.'));
     }catch(err){
-      console.error(err); alert('⚠️ Network error.');
+      console.error(err);
+      if (queueIfOffline('event', formData, err)){ form.reset(); wrap.classList.add('hidden'); return; }
+      alert('⚠️ Network error.');
     }
   });
 })();